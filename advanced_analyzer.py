@@ -9,7 +9,11 @@ import json
 import datetime
 import time
 from collections import defaultdict, Counter
-import chardet
+import codecs
+try:
+    import cchardet as chardet # C binding of uchardet; same detect() API, much faster
+except ImportError:
+    import chardet
 
 # List of common code smells and anti-patterns to detect
 CODE_SMELLS = {
@@ -190,6 +194,60 @@ BEST_PRACTICES = {
 }
 
 
+# A comment containing any of these probably holds commented-out code
+CODE_INDICATOR_PATTERNS = [re.compile(pattern) for pattern in (
+    r'\bif\b', r'\bfor\b', r'\bwhile\b', r'\bdef\b', r'\bfunction\b',
+    r'\breturn\b', r'\bclass\b', r'{', r'}', r'=', r'\(.*\)'
+)]
+
+# Language of each extension the advanced analysis understands
+EXTENSION_LANGUAGES = {
+    '.py': 'Python',
+    '.pyw': 'Python',
+    '.js': 'JavaScript',
+    '.jsx': 'JavaScript',
+    '.ts': 'TypeScript',
+    '.tsx': 'TypeScript',
+    '.java': 'Java',
+    '.c': 'C',
+    '.cpp': 'C++',
+    '.h': 'C/C++',
+    '.hpp': 'C++',
+    '.cs': 'C#',
+    '.rb': 'Ruby',
+    '.php': 'PHP',
+    '.swift': 'Swift',
+    '.go': 'Go',
+    '.rs': 'Rust',
+    '.html': 'HTML',
+    '.htm': 'HTML',
+    '.css': 'CSS',
+    '.scss': 'SCSS',
+    '.sass': 'SASS',
+    '.less': 'LESS',
+    '.sql': 'SQL'
+}
+
+
+def detect_encoding(raw_content):
+    """Returns the encoding to decode a file's bytes with.
+
+    ASCII, BOM-marked and valid UTF-8 files (nearly all source code) are recognised
+    directly; only the rest go through chardet's much slower statistical detection.
+    """
+    if raw_content.isascii():
+        return 'ascii'
+    if raw_content.startswith(codecs.BOM_UTF8):
+        return 'UTF-8-SIG'
+    try:
+        raw_content.decode('utf-8')
+        return 'utf-8'
+    except UnicodeDecodeError:
+        pass
+    result = chardet.detect(raw_content)
+    return result['encoding'] if result['encoding'] else 'utf-8'
+
+
 class AdvancedCodeAnalyzer:
     """Advanced code analysis capabilities for Rick's Code Analyzer"""
 
@@ -239,7 +297,7 @@ class AdvancedCodeAnalyzer:
         self.update_progress("Starting advanced analysis...")
 
         # Extract list of files
-        files_to_analyze = [file_data['path'] for file_data in file_stats.values()]
+        files_to_analyze = list(file_stats) # Keyed by path
         self.analyzed_files = set(files_to_analyze)
 
         # Analyze each file
@@ -255,8 +313,7 @@ class AdvancedCodeAnalyzer:
                         raw_content = f.read()
 
                     # Detect encoding
-                    result = chardet.detect(raw_content)
-                    encoding = result['encoding'] if result['encoding'] else 'utf-8'
+                    encoding = detect_encoding(raw_content)
 
                     # Decode content with detected encoding
                     try:
@@ -302,33 +359,7 @@ class AdvancedCodeAnalyzer:
 
     def _get_language_from_extension(self, extension):
         """Get programming language from file extension"""
-        languages = {
-            '.py': 'Python',
-            '.pyw': 'Python',
-            '.js': 'JavaScript',
-            '.jsx': 'JavaScript',
-            '.ts': 'TypeScript',
-            '.tsx': 'TypeScript',
-            '.java': 'Java',
-            '.c': 'C',
-            '.cpp': 'C++',
-            '.h': 'C/C++',
-            '.hpp': 'C++',
-            '.cs': 'C#',
-            '.rb': 'Ruby',
-            '.php': 'PHP',
-            '.swift': 'Swift',
-            '.go': 'Go',
-            '.rs': 'Rust',
-            '.html': 'HTML',
-            '.htm': 'HTML',
-            '.css': 'CSS',
-            '.scss': 'SCSS',
-            '.sass': 'SASS',
-            '.less': 'LESS',
-            '.sql': 'SQL'
-        }
-        return languages.get(extension, "Unknown")
+        return EXTENSION_LANGUAGES.get(extension, "Unknown")
 
     def _analyze_python_file(self, file_path, content):
         """Analyze Python file using AST, with better error handling"""
@@ -484,7 +515,7 @@ class AdvancedCodeAnalyzer:
         for pattern_name, pattern_data in PYTHON_ANTI_PATTERNS.items():
             matches = re.finditer(pattern_data['regex'], content)
             for match in matches:
-                line_number = content[:match.start()].count('\n') + 1
+                line_number = content.count('\n', 0, match.start()) + 1
                 self.results['code_smells'][file_path].append({
                     'type': pattern_name,
                     'description': pattern_data['description'],
@@ -505,7 +536,7 @@ class AdvancedCodeAnalyzer:
         for pattern_name, pattern_data in JS_ANTI_PATTERNS.items():
             matches = re.finditer(pattern_data['regex'], content)
             for match in matches:
-                line_number = content[:match.start()].count('\n') + 1
+                line_number = content.count('\n', 0, match.start()) + 1
                 self.results['code_smells'][file_path].append({
                     'type': pattern_name,
                     'description': pattern_data['description'],
@@ -530,7 +561,7 @@ class AdvancedCodeAnalyzer:
         for match in matches:
             func_name = match.group(1) or match.group(2) or match.group(3)
             if func_name:
-                line_number = content[:match.start()].count('\n') + 1
+                line_number = content.count('\n', 0, match.start()) + 1
 
                 # Check for long functions (simplified)
                 func_start = match.start()
@@ -587,7 +618,9 @@ class AdvancedCodeAnalyzer:
             'Rust': ['//', '/*'],
         }
 
-        markers = comment_markers.get(language, ['#', '//'])
+        # A tuple so one startswith() call tests every marker
+        markers = tuple(comment_markers.get(language, ['#', '//']))
+        has_block_comments = language in ['JavaScript', 'Java', 'C', 'C++', 'C#', 'PHP', 'Swift']
         in_block_comment = False
         commented_code_lines = []
         current_block = []
@@ -600,7 +633,7 @@ class AdvancedCodeAnalyzer:
                 continue
 
             # Check for block comments start/end
-            if language in ['JavaScript', 'Java', 'C', 'C++', 'C#', 'PHP', 'Swift']:
+            if has_block_comments:
                 if '/*' in line_stripped and '*/' not in line_stripped[line_stripped.index('/*') + 2:]:
                     in_block_comment = True
 
@@ -608,28 +641,19 @@ class AdvancedCodeAnalyzer:
                     in_block_comment = False
 
             # Check if line is a comment
-            is_comment = False
-            for marker in markers:
-                if line_stripped.startswith(marker):
-                    is_comment = True
-                    break
+            is_comment = line_stripped.startswith(markers)
 
             if is_comment or in_block_comment:
-                # Check if comment line contains code
-                code_indicators = [
-                    r'\bif\b', r'\bfor\b', r'\bwhile\b', r'\bdef\b', r'\bfunction\b',
-                    r'\breturn\b', r'\bclass\b', r'{', r'}', r'=', r'\(.*\)'
-                ]
-
-                for indicator in code_indicators:
-                    # Remove the comment marker before checking
-                    code_line = line_stripped
+                # Remove the comment marker before checking whether the comment contains code
+                code_line = line_stripped
+                if is_comment:
                     for marker in markers:
                         if code_line.startswith(marker):
                             code_line = code_line[len(marker):].strip()
                             break
 
-                    if re.search(indicator, code_line):
+                for indicator in CODE_INDICATOR_PATTERNS:
+                    if indicator.search(code_line):
                         current_block.append((i + 1, line_stripped))
                         break
             else:
@@ -664,7 +688,7 @@ class AdvancedCodeAnalyzer:
             # Check for vulnerability pattern
             matches = re.finditer(vuln_data['regex'], content)
             for match in matches:
-                line_number = content[:match.start()].count('\n') + 1
+                line_number = content.count('\n', 0, match.start()) + 1
                 self.results['security_issues'][file_path].append({
                     'type': vuln_name,
                     'description': vuln_data['description'],
@@ -684,7 +708,7 @@ class AdvancedCodeAnalyzer:
             if 'regex' in issue_data:
                 matches = re.finditer(issue_data['regex'], content)
                 for match in matches:
-                    line_number = content[:match.start()].count('\n') + 1
+                    line_number = content.count('\n', 0, match.start()) + 1
                     self.results['performance_issues'][file_path].append({
                         'type': issue_name,
                         'description': issue_data['description'],
@@ -713,7 +737,7 @@ class AdvancedCodeAnalyzer:
             # Check for nesting
             for i, match in enumerate(loop_matches):
                 loop_start = match.start()
-                line_number = content[:loop_start].count('\n') + 1
+                line_number = content.count('\n', 0, loop_start) + 1
 
                 # Find the block for this loop
                 # (Simplified approach - won't work for all cases)
@@ -772,7 +796,7 @@ class AdvancedCodeAnalyzer:
                 inner_loops = re.search(loop_regex, block_content)
 
                 if inner_loops:
-                    inner_line = line_number + block_content[:inner_loops.start()].count('\n')
+                    inner_line = line_number + block_content.count('\n', 0, inner_loops.start())
                     self.results['performance_issues'][file_path].append({
                         'type': 'nested_loops',
                         'description': f"Nested loops detected (outer loop at line {line_number}, inner at line {inner_line})",
@@ -797,17 +821,13 @@ class AdvancedCodeAnalyzer:
         comment_lines = 0
         for i, line in enumerate(lines):
             line_stripped = line.strip()
-            is_comment = False
-            for marker in markers:
-                if line_stripped.startswith(marker):
-                    is_comment = True
-                    break
+            is_comment = line_stripped.startswith(markers)
 
             if is_comment or in_block_comment:
                 comment_lines += 1
 
             # Check for block comments
-            if language in ['JavaScript', 'Java', 'C', 'C++', 'C#', 'PHP', 'Swift']:
+            if has_block_comments:
                 if '/*' in line_stripped and '*/' not in line_stripped[line_stripped.index('/*') + 2:]:
                     in_block_comment = True
 
@@ -848,7 +868,8 @@ class AdvancedCodeAnalyzer:
             'PHP': ['//', '/*', '#']
         }
 
-        markers = comment_markers.get(language, ['#', '//'])
+        markers = tuple(comment_markers.get(language, ['#', '//']))
+        has_block_comments = language in ['JavaScript', 'Java', 'C', 'C++', 'C#', 'PHP']
         in_block_comment = False
 
         for line in lines:
@@ -859,7 +880,7 @@ class AdvancedCodeAnalyzer:
                 continue
 
             # Check for block comments
-            if language in ['JavaScript', 'Java', 'C', 'C++', 'C#', 'PHP']:
+            if has_block_comments:
                 if '/*' in line_stripped and '*/' not in line_stripped[line_stripped.index('/*') + 2:]:
                     in_block_comment = True
 
@@ -868,11 +889,7 @@ class AdvancedCodeAnalyzer:
                     continue
 
             # Skip comments
-            is_comment = False
-            for marker in markers:
-                if line_stripped.startswith(marker):
-                    is_comment = True
-                    break
+            is_comment = line_stripped.startswith(markers)
 
             if is_comment or in_block_comment:
                 continue
@@ -1269,7 +1286,6 @@ if __name__ == "__main__":
     file_stats = {
         'test.py': {
             'name': 'test.py',
-            'path': 'test.py',
             'lines': 100,
             'language': 'Python'
         }
@@ -3,14 +3,20 @@
 # v4.3 - Fixed f-string syntax error for {} in generated JS
 
 import os
+import io
 import json
+import re
 import random
 import datetime
+import functools
+import heapq
 import webbrowser
 import tempfile
 from collections import defaultdict, Counter
 import traceback
 
+from cache_utils import create_template_env
+
 # --- Required Package Checks ---
 REPORT_PACKAGES_AVAILABLE = True
 PYGMENTS_AVAILABLE = True
@@ -476,6 +482,54 @@ HTML_REPORT_TEMPLATE = '''
 '''
 
 
+# Characters dropped from report file names (same rule as the main app: isalnum, '_' and '-' kept)
+SAFE_NAME_STRIP_RE = re.compile(r'[^\w-]+')
+
+
+# Compiled report bytecode is kept on disk (same cache as the main app's templates) so a fresh
+# process can skip compiling HTML_REPORT_TEMPLATE. Bump TEMPLATE_CACHE_VERSION whenever the
+# Environment options below change how the template compiles.
+TEMPLATE_CACHE_VERSION = 1
+
+
+@functools.lru_cache(maxsize=None)
+def _get_report_template():
+    """Compiles HTML_REPORT_TEMPLATE once; later reports reuse the compiled template."""
+    # A named template (rather than from_string) is what lets the bytecode cache be used
+    template_env = create_template_env(
+        jinja2.DictLoader({'advanced_report.html': HTML_REPORT_TEMPLATE}),
+        f"adv_v{TEMPLATE_CACHE_VERSION}",
+        autoescape=jinja2.select_autoescape(['html', 'xml']),
+        trim_blocks=True,
+        lstrip_blocks=True
+    )
+    return template_env.get_template('advanced_report.html')
+
+
+@functools.lru_cache(maxsize=16)
+def _get_no_graph_js_cached(message_escaped, is_error):
+    """Build (and memoize) the no-graph placeholder JS; the set of messages is small and fixed."""
+    is_error_js = 'true' if is_error else 'false'
+    # This f-string *only* uses Python interpolation, so no double braces needed here
+    js = f"""
+        // --- Graph JS Placeholder ---
+        (function() {{
+            const graphContainer = document.getElementById('dependencyGraphContainer');
+            const loadingMsg = document.getElementById('graphLoadingMsg');
+            const errorMsgDiv = document.getElementById('graphErrorMsg');
+            if (loadingMsg) {{ loadingMsg.style.display = 'none'; }}
+            const displayDiv = {'errorMsgDiv' if is_error else 'loadingMsg'};
+            if (displayDiv) {{
+                displayDiv.textContent = '{message_escaped}';
+                displayDiv.style.display = 'block';
+                if({is_error_js} && errorMsgDiv) {{ errorMsgDiv.className = 'error-box'; errorMsgDiv.style.position='relative'; errorMsgDiv.style.top=''; errorMsgDiv.style.left=''; errorMsgDiv.style.transform=''; }}
+                if(graphContainer) {{ graphContainer.style.height = '80px'; }}
+            }} else {{ console.warn("Could not find graph message element to update: {message_escaped}"); }}
+        }})();
+        """
+    return js.strip()
+
+
 class AdvancedReporter:
     """Advanced report generation for Rick's Code Analyzer"""
 
@@ -509,7 +563,7 @@ class AdvancedReporter:
 
             project_name = os.path.basename(project_path) if project_path and isinstance(project_path, str) else "report"
             timestamp = datetime.datetime.now().strftime('%Y%m%d_%H%M%S')
-            safe_project_name = "".join(c for c in project_name if c.isalnum() or c in ('_', '-')).rstrip()
+            safe_project_name = SAFE_NAME_STRIP_RE.sub('', project_name)
             file_path = os.path.join(report_dir, f"rick_advanced_report_{safe_project_name}_{timestamp}.html")
             self.update_progress(f"DEBUG: Report file path set to: {file_path}")
 
@@ -519,13 +573,7 @@ class AdvancedReporter:
                 return None
             self.update_progress("DEBUG: Template data prepared successfully.")
 
-            template_env = jinja2.Environment(
-                loader=jinja2.BaseLoader(),
-                autoescape=jinja2.select_autoescape(['html', 'xml']),
-                trim_blocks=True,
-                lstrip_blocks=True
-            )
-            template = template_env.from_string(HTML_REPORT_TEMPLATE)
+            template = _get_report_template()
             self.update_progress("DEBUG: Rendering HTML content...")
             html_content = template.render(**template_data)
             self.update_progress(f"DEBUG: HTML content rendered (length: {len(html_content)}).")
@@ -606,19 +654,22 @@ class AdvancedReporter:
                 ]
                 # Sort by count descending
                 encoding_stats_list.sort(key=lambda x: x['count'], reverse=True)
-            for fs_path in file_stats:
-                 if isinstance(file_stats[fs_path], dict): file_stats[fs_path]['issues'] = file_stats[fs_path].get('issues', 0)
+            # Normalise every file_stats key once; lookups below are then O(1) instead of a scan per file
+            norm_to_fs_key = {}
+            for fs_path, fs_data in file_stats.items():
+                 if isinstance(fs_data, dict):
+                     fs_data['issues'] = fs_data.get('issues', 0)
+                     norm_to_fs_key.setdefault(os.path.normpath(fs_path), fs_path)
             for category in issue_categories:
                 for file_path, issues in advanced_analysis.get(category, {}).items():
                     normalized_issue_file_path = os.path.normpath(file_path)
-                    matched_fs_key = None
-                    for fs_key in file_stats.keys():
-                        if os.path.normpath(fs_key) == normalized_issue_file_path: matched_fs_key = fs_key; break
-                    if matched_fs_key and isinstance(file_stats[matched_fs_key], dict):
+                    matched_fs_key = norm_to_fs_key.get(normalized_issue_file_path)
+                    if matched_fs_key:
                          file_stats[matched_fs_key]['issues'] += len(issues)
                          all_issues_by_file[matched_fs_key][category].extend(issues)
                     else: self.update_progress(f"DEBUG: Issue file path '{normalized_issue_file_path}' not found/invalid in basic file_stats.")
-            largest_files = sorted([{'name': os.path.basename(p), **s} for p, s in file_stats.items() if isinstance(s, dict) and 'lines' in s], key=lambda x: x.get('lines', 0), reverse=True)[:10]
+            # Only the ten winners get a merged row dict
+            largest_files = [{'name': os.path.basename(p), **s} for p, s in heapq.nlargest(10, ((p, s) for p, s in file_stats.items() if isinstance(s, dict) and 'lines' in s), key=lambda item: item[1]['lines'])]
             file_tree = []
             processed_paths_for_tree = set()
             for file_path_key, stats in file_stats.items():
@@ -642,16 +693,14 @@ class AdvancedReporter:
             dependency_scan_data = extras_results.get('dependency_scan') if extras_results else None
             dependency_graph_data = extras_results.get('dependency_graph') if extras_results else None
             file_details_for_json = {}
+            name_to_fs_key = {}
+            for fs_key, fs_data in file_stats.items():
+                 if isinstance(fs_data, dict): name_to_fs_key.setdefault(fs_data.get('name'), fs_key)
             for item in file_tree:
                 original_full_path = None; stats = None; found = False
                 tree_item_path_reconstructed = os.path.normpath(os.path.join(project_path_norm, item['path'].replace('/', os.sep))) if project_path_norm else item['path']
-                for fs_key, fs_data in file_stats.items():
-                     if not isinstance(fs_data, dict): continue
-                     if os.path.normpath(fs_key) == tree_item_path_reconstructed: original_full_path = fs_key; stats = fs_data; found = True; break
-                if not found:
-                     for fs_key, fs_data in file_stats.items():
-                         if not isinstance(fs_data, dict): continue
-                         if fs_data.get('name') == item['name']: original_full_path = fs_key; stats = fs_data; found = True; break
+                original_full_path = norm_to_fs_key.get(tree_item_path_reconstructed) or name_to_fs_key.get(item['name'])
+                if original_full_path: stats = file_stats[original_full_path]; found = True
                 if found and original_full_path and stats:
                      display_path_key = item['path']
                      file_details_for_json[display_path_key] = {'name': stats.get('name', 'Unknown'), 'language': stats.get('language', 'Unknown'), 'lines': stats.get('lines', 0), 'code': stats.get('code', 0), 'comments': stats.get('comments', 0), 'blank': stats.get('blank', 0), 'all_issues': all_issues_by_file.get(original_full_path, {})}
@@ -732,7 +781,7 @@ class AdvancedReporter:
                 label = str(lang.get("language","?")).replace("'", "\\'")[:15]
                 value = int(lang.get("count",0))
                 if value > 0: lang_data_list.append({ "label": label, "value": value })
-            lang_data_js = json.dumps(lang_data_list)
+            lang_bars_js = json.dumps(self._bar_chart_geometry(lang_data_list))
             maintainability_score = int(template_data.get('maintainability_score', 0))
             avg_complexity_val = float(template_data.get('avg_function_complexity', 0))
             avg_complexity_bar = max(1, int(avg_complexity_val))
@@ -740,28 +789,33 @@ class AdvancedReporter:
             avg_size_bar = max(1, int(avg_size_val))
             debt_days_val = float(template_data.get('technical_debt_days', 0))
             debt_days_bar = max(1, int(debt_days_val))
-            complexity_data_js = json.dumps([
+            complexity_data_list = [
                  { "label": 'Maintain.', "value": max(1, maintainability_score), "origValue": maintainability_score },
                  { "label": 'Avg Comp.', "value": avg_complexity_bar, "origValue": round(avg_complexity_val,1) },
                  { "label": 'Avg Size', "value": avg_size_bar, "origValue": round(avg_size_val,1) },
                  { "label": 'Debt Days', "value": debt_days_bar, "origValue": round(debt_days_val,1) }
-             ])
+             ]
+            complexity_bars_js = json.dumps(self._bar_chart_geometry(complexity_data_list))
+            lang_gridlines_js = json.dumps(self._bar_chart_gridlines(lang_data_list))
+            complexity_gridlines_js = json.dumps(self._bar_chart_gridlines(complexity_data_list))
 
             # *** F-STRING WITH DOUBLED BRACES for JS code ***
             js_code = f"""
             // --- Charts JS ---
             (function() {{ // IIFE Wrapper - Double Braces
                 console.log("Initializing charts...");
-                const chartTextColor = getComputedStyle(document.documentElement).getPropertyValue('--text-color') || '#00FF00';
-                const chartAccent1 = getComputedStyle(document.documentElement).getPropertyValue('--accent1-color') || '#00FFFF';
-                const chartAccent2 = getComputedStyle(document.documentElement).getPropertyValue('--accent2-color') || '#FF00FF';
-                const chartErrorColor = getComputedStyle(document.documentElement).getPropertyValue('--error-color') || '#FF0000';
-                const chartWarningColor = getComputedStyle(document.documentElement).getPropertyValue('--warning-color') || '#FF6000';
-                const chartHighlightColor = getComputedStyle(document.documentElement).getPropertyValue('--highlight-color') || '#39FF14';
-                const chartFont = '14px VT323';
+                const rootStyle = getComputedStyle(document.documentElement); // Read CSS vars from a single style lookup
+                const chartTextColor = rootStyle.getPropertyValue('--text-color') || '#00FF00';
+                const chartAccent1 = rootStyle.getPropertyValue('--accent1-color') || '#00FFFF';
+                const chartAccent2 = rootStyle.getPropertyValue('--accent2-color') || '#FF00FF';
+                const chartErrorColor = rootStyle.getPropertyValue('--error-color') || '#FF0000';
+                const chartWarningColor = rootStyle.getPropertyValue('--warning-color') || '#FF6000';
+                const chartHighlightColor = rootStyle.getPropertyValue('--highlight-color') || '#39FF14';
+
+                const chartTheme = {{ text: chartTextColor, accent1: chartAccent1, accent2: chartAccent2, font: 'VT323, monospace' }}; // Plain data so it can be posted to a worker
 
                 try {{ // Double Braces
-                    function createCanvasIfMissing(containerId, canvasId) {{ // Double Braces
+                    function prepareCanvas(containerId, canvasId) {{ // Double Braces - sizes the canvas before any rendering/transfer
                         const container = document.getElementById(containerId);
                         if (!container) {{ console.error('Chart container missing:', containerId); return null; }} // Double Braces
                         let canvas = document.getElementById(canvasId);
@@ -769,58 +823,112 @@ class AdvancedReporter:
                             canvas = document.createElement('canvas'); canvas.id = canvasId;
                             container.innerHTML = ''; container.appendChild(canvas);
                             console.log('Created and appended canvas:', canvasId, 'to', containerId);
-                        }} else {{ console.log('Found existing canvas:', canvasId); }} // Double Braces
-                        canvas.width = container.clientWidth > 50 ? container.clientWidth : 300;
-                        canvas.height = container.clientHeight > 50 ? container.clientHeight : 250;
-                        if (canvas.width <= 0 || canvas.height <= 0) {{ // Double Braces
-                            console.warn('Canvas has zero or negative dimensions:', canvasId, canvas.width, canvas.height);
-                            canvas.width = 300; canvas.height = 250;
                         }} // Double Braces
+                        if (!canvas.getContext) {{ console.error('Canvas not supported:', canvasId); return null; }} // Double Braces
+                        const containerWidth = container.clientWidth, containerHeight = container.clientHeight; // Read layout once
+                        canvas.width = containerWidth > 50 ? containerWidth : 300;
+                        canvas.height = containerHeight > 50 ? containerHeight : 250;
                         return canvas;
                     }} // End Double Braces
 
-                    function createPieChart(canvasId, data, colors) {{ // Double Braces
-                        const canvas = document.getElementById(canvasId);
-                        if (!canvas || !canvas.getContext) {{ console.error('PieChart: Canvas not ready:', canvasId); return; }} // Double Braces
-                        const ctx = canvas.getContext('2d'); const width = canvas.width; const height = canvas.height;
+                    // Draw functions only touch the 2D context they are given, so the same
+                    // source runs on a DOM canvas or on an OffscreenCanvas inside a worker.
+                    function drawPieChart(ctx, width, height, data, colors, theme) {{ // Double Braces
                         ctx.clearRect(0, 0, width, height); const centerX = width / 2; const centerY = height / 2;
                         const radius = Math.min(centerX, centerY) * 0.65; let startAngle = -0.5 * Math.PI;
                         const total = data.reduce((sum, item) => sum + item.value, 0);
-                        if (total === 0) {{ ctx.font = '18px VT323'; ctx.fillStyle = chartTextColor; ctx.textAlign = 'center'; ctx.fillText("No issue data", centerX, centerY); return; }} // Double Braces
+                        if (total === 0) {{ ctx.font = '18px ' + theme.font; ctx.fillStyle = theme.text; ctx.textAlign = 'center'; ctx.fillText("No issue data", centerX, centerY); return; }} // Double Braces
                         data.forEach((item, i) => {{ if (item.value <= 0) return; const sliceAngle = 2 * Math.PI * item.value / total; const endAngle = startAngle + sliceAngle; ctx.beginPath(); ctx.moveTo(centerX, centerY); ctx.arc(centerX, centerY, radius, startAngle, endAngle); ctx.closePath(); ctx.fillStyle = colors[i % colors.length]; ctx.fill(); startAngle = endAngle; }}); // Double Braces forEach block
                         const legendFontSize = 14; const legendBoxSize = 12; const legendSpacing = 5; let legendX = 10; let legendY = 15;
-                        ctx.font = legendFontSize + 'px VT323'; ctx.textAlign = 'left'; ctx.textBaseline = 'top';
-                        data.forEach((item, i) => {{ ctx.fillStyle = colors[i % colors.length]; ctx.fillRect(legendX, legendY, legendBoxSize, legendBoxSize); ctx.fillStyle = chartTextColor; const labelText = `${{item.label}}: ${{item.value}} (${{(item.value / total * 100).toFixed(1)}}%)`; ctx.fillText(labelText, legendX + legendBoxSize + legendSpacing, legendY); legendY += legendFontSize + legendSpacing; if (legendY > height - legendFontSize) {{ legendY = 15; legendX += (ctx.measureText(labelText).width + 30); }} }}); // Double Braces forEach block and if block
+                        ctx.font = legendFontSize + 'px ' + theme.font; ctx.textAlign = 'left'; ctx.textBaseline = 'top';
+                        data.forEach((item, i) => {{ ctx.fillStyle = colors[i % colors.length]; ctx.fillRect(legendX, legendY, legendBoxSize, legendBoxSize); ctx.fillStyle = theme.text; const labelText = `${{item.label}}: ${{item.value}} (${{(item.value / total * 100).toFixed(1)}}%)`; ctx.fillText(labelText, legendX + legendBoxSize + legendSpacing, legendY); legendY += legendFontSize + legendSpacing; if (legendY > height - legendFontSize) {{ legendY = 15; legendX += (ctx.measureText(labelText).width + 30); }} }}); // Double Braces forEach block and if block
                     }} // End Double Braces
 
-                    function createBarChart(canvasId, data, title) {{ // Double Braces
-                        const canvas = document.getElementById(canvasId);
-                        if (!canvas || !canvas.getContext) {{ console.error('BarChart: Canvas not ready:', canvasId); return; }} // Double Braces
-                        const ctx = canvas.getContext('2d'); const width = canvas.width; const height = canvas.height; ctx.clearRect(0, 0, width, height);
-                        if (!data || data.length === 0) {{ ctx.font = '18px VT323'; ctx.fillStyle = chartTextColor; ctx.textAlign = 'center'; ctx.fillText("No data for " + title, width/2, height/2); return; }} // Double Braces
+                    function drawBarChart(ctx, width, height, bars, title, gridlines, theme) {{ // Double Braces - bar geometry precomputed in Python as fractions of the plot area
+                        ctx.clearRect(0, 0, width, height);
+                        if (!bars || bars.length === 0) {{ ctx.font = '18px ' + theme.font; ctx.fillStyle = theme.text; ctx.textAlign = 'center'; ctx.fillText("No data for " + title, width/2, height/2); return; }} // Double Braces
                         const marginTop = 40, marginRight = 20, marginBottom = 50, marginLeft = 50; const chartWidth = width - marginLeft - marginRight; const chartHeight = height - marginTop - marginBottom; if (chartWidth <= 0 || chartHeight <= 0) {{ console.warn("BarChart: Invalid dimensions:", chartWidth, chartHeight); return; }} // Double Braces
-                        const barCount = data.length; const totalSpacing = chartWidth * 0.2; const barSpacing = totalSpacing / (barCount + 1); const barWidth = (chartWidth - totalSpacing) / barCount; const maxValue = Math.max(1, ...data.map(item => item.value));
-                        ctx.strokeStyle = chartTextColor; ctx.lineWidth = 0.5; ctx.fillStyle = chartTextColor; ctx.font = '12px VT323'; ctx.textAlign = 'right'; ctx.textBaseline = 'middle'; const numYLabels = 5;
-                        for(let i = 0; i <= numYLabels; i++) {{ const yPos = marginTop + chartHeight * (1 - i / numYLabels); const labelValue = (maxValue * i / numYLabels); const displayValue = labelValue >= 1 ? labelValue.toFixed(0) : labelValue.toFixed(1); ctx.fillText(displayValue, marginLeft - 8, yPos); ctx.beginPath(); ctx.moveTo(marginLeft - 4, yPos); ctx.lineTo(marginLeft + chartWidth, yPos); ctx.stroke(); }} // Double Braces for loop block
-                        data.forEach((item, i) => {{ const barHeight = Math.max(1, (item.value / maxValue) * chartHeight); const x = marginLeft + barSpacing + (barWidth + barSpacing) * i; const y = marginTop + chartHeight - barHeight; ctx.fillStyle = chartAccent1; ctx.fillRect(x, y, barWidth, barHeight); const displayValue = item.origValue !== undefined ? item.origValue : item.value; ctx.fillStyle = chartTextColor; ctx.font = '12px VT323'; ctx.textAlign = 'center'; ctx.fillText(displayValue.toString(), x + barWidth / 2, y - 8); ctx.save(); ctx.translate(x + barWidth / 2, marginTop + chartHeight + 10); ctx.rotate(Math.PI / 6); ctx.textAlign = 'left'; ctx.textBaseline = 'middle'; ctx.fillText(item.label, 0, 0); ctx.restore(); }}); // Double Braces forEach block
-                        ctx.strokeStyle = chartTextColor; ctx.lineWidth = 1; ctx.beginPath(); ctx.moveTo(marginLeft, marginTop); ctx.lineTo(marginLeft, marginTop + chartHeight); ctx.stroke(); ctx.beginPath(); ctx.moveTo(marginLeft, marginTop + chartHeight); ctx.lineTo(marginLeft + chartWidth, marginTop + chartHeight); ctx.stroke();
-                        ctx.fillStyle = chartAccent2; ctx.font = '16px VT323'; ctx.textAlign = 'center'; ctx.fillText(title, width / 2, marginTop / 2);
+                        ctx.strokeStyle = theme.text; ctx.lineWidth = 0.5; ctx.fillStyle = theme.text; ctx.font = '12px ' + theme.font; ctx.textAlign = 'right'; ctx.textBaseline = 'middle';
+                        gridlines.forEach(g => {{ const yPos = marginTop + chartHeight * (1 - g.frac); ctx.fillText(g.label, marginLeft - 8, yPos); ctx.beginPath(); ctx.moveTo(marginLeft - 4, yPos); ctx.lineTo(marginLeft + chartWidth, yPos); ctx.stroke(); }}); // Double Braces forEach block (gridlines precomputed in Python)
+                        bars.forEach(b => {{ const barHeight = Math.max(1, b.h * chartHeight); const barWidth = b.w * chartWidth; const x = marginLeft + b.x * chartWidth; const y = marginTop + chartHeight - barHeight; ctx.fillStyle = theme.accent1; ctx.fillRect(x, y, barWidth, barHeight); ctx.fillStyle = theme.text; ctx.font = '12px ' + theme.font; ctx.textAlign = 'center'; ctx.fillText(b.valueText, x + barWidth / 2, y - 8); ctx.save(); ctx.translate(x + barWidth / 2, marginTop + chartHeight + 10); ctx.rotate(Math.PI / 6); ctx.textAlign = 'left'; ctx.textBaseline = 'middle'; ctx.fillText(b.label, 0, 0); ctx.restore(); }}); // Double Braces forEach block
+                        ctx.strokeStyle = theme.text; ctx.lineWidth = 1; ctx.beginPath(); ctx.moveTo(marginLeft, marginTop); ctx.lineTo(marginLeft, marginTop + chartHeight); ctx.stroke(); ctx.beginPath(); ctx.moveTo(marginLeft, marginTop + chartHeight); ctx.lineTo(marginLeft + chartWidth, marginTop + chartHeight); ctx.stroke();
+                        ctx.fillStyle = theme.accent2; ctx.font = '16px ' + theme.font; ctx.textAlign = 'center'; ctx.fillText(title, width / 2, marginTop / 2);
+                    }} // End Double Braces
+
+                    // Fonts loaded by the page's CSS aren't visible inside a worker, so the worker loads VT323
+                    // itself from the same Google Fonts stylesheet; runs only in the worker (via toString()).
+                    async function loadChartFont(cssUrl) {{ // Double Braces
+                        if (typeof FontFace === 'undefined' || !self.fonts) return false;
+                        const css = await (await fetch(cssUrl)).text();
+                        const faces = [];
+                        for (const block of css.split('@font-face').slice(1)) {{ // Double Braces - one face per unicode-range subset
+                            const src = /url\\(([^)]+)\\)/.exec(block);
+                            const range = /unicode-range:\\s*([^;}}]+)/.exec(block);
+                            if (src) faces.push(new FontFace('VT323', 'url(' + src[1] + ')', range ? {{ unicodeRange: range[1].trim() }} : {{}}));
+                        }} // End Double Braces
+                        if (faces.length === 0) return false;
+                        await Promise.all(faces.map(face => face.load()));
+                        faces.forEach(face => self.fonts.add(face));
+                        return true;
+                    }} // End Double Braces
+
+                    // Off-main-thread rendering: build the worker from the draw functions' own source
+                    const chartFontCss = 'https://fonts.googleapis.com/css2?family=VT323&display=swap';
+                    function createChartWorker() {{ // Double Braces
+                        if (typeof OffscreenCanvas === 'undefined' || typeof Worker === 'undefined' || typeof Blob === 'undefined') return null;
+                        try {{ // Double Braces
+                            const workerSrc = loadChartFont.toString() + '\\n' + drawPieChart.toString() + '\\n' + drawBarChart.toString() + '\\n' +
+                                'const chartDrawers = {{ pie: drawPieChart, bar: drawBarChart }}, chartJobs = [];\\n' +
+                                'const drawJob = job => chartDrawers[job.kind](job.canvas.getContext("2d"), job.canvas.width, job.canvas.height, ...job.args);\\n' +
+                                'self.onmessage = function(e) {{ chartJobs.push(e.data); drawJob(e.data); }};\\n' +
+                                'loadChartFont(' + JSON.stringify(chartFontCss) + ').then(ok => {{ if (ok) chartJobs.forEach(drawJob); }}, () => {{}});';
+                            const workerUrl = URL.createObjectURL(new Blob([workerSrc], {{ type: 'application/javascript' }}));
+                            try {{ return new Worker(workerUrl); }} // Double Braces
+                            finally {{ URL.revokeObjectURL(workerUrl); }} // Double Braces - the Worker has already resolved the blob
+                        }} catch (err) {{ console.warn('Chart worker unavailable, rendering on main thread:', err); return null; }} // Double Braces
+                    }} // End Double Braces
+                    const chartDrawers = {{ pie: drawPieChart, bar: drawBarChart }};
+
+                    function renderChart(worker, canvas, kind, args) {{ // Double Braces - returns true if drawn on the main thread
+                        if (worker && canvas.transferControlToOffscreen) {{ // Double Braces
+                            try {{ // Double Braces
+                                const off = canvas.transferControlToOffscreen();
+                                worker.postMessage({{ canvas: off, kind: kind, args: args }}, [off]);
+                                return false;
+                            }} catch (err) {{ console.warn('OffscreenCanvas transfer failed, rendering on main thread:', err); }} // Double Braces
+                        }} // End Double Braces
+                        chartDrawers[kind](canvas.getContext('2d'), canvas.width, canvas.height, ...args);
+                        return true;
                     }} // End Double Braces
 
                     // Data insertion remains the same - uses Python vars converted to JS strings
                     const pieData = {pie_data_js};
-                    const langData = {lang_data_js};
-                    const complexityData = {complexity_data_js};
+                    const langBars = {lang_bars_js};
+                    const complexityBars = {complexity_bars_js};
+                    const langGridlines = {lang_gridlines_js};
+                    const complexityGridlines = {complexity_gridlines_js};
 
                     // Create charts
-                    const overallCanvas = createCanvasIfMissing('overallChart', 'overallCanvasElement');
-                    const languageCanvas = createCanvasIfMissing('languageChart', 'languageCanvasElement');
-                    const complexityCanvas = createCanvasIfMissing('complexityChart', 'complexityCanvasElement');
+                    const overallCanvas = prepareCanvas('overallChart', 'overallCanvasElement');
+                    const languageCanvas = prepareCanvas('languageChart', 'languageCanvasElement');
+                    const complexityCanvas = prepareCanvas('complexityChart', 'complexityCanvasElement');
 
                     // Conditional execution needs no double braces
-                    if (overallCanvas) createPieChart('overallCanvasElement', pieData, [chartHighlightColor, chartErrorColor, chartWarningColor, chartAccent2, chartAccent1]);
-                    if (languageCanvas) createBarChart('languageCanvasElement', langData, 'Language Distribution');
-                    if (complexityCanvas) createBarChart('complexityCanvasElement', complexityData, 'Code Quality Metrics');
+                    const chartJobs = [];
+                    if (overallCanvas) chartJobs.push([overallCanvas, 'pie', [pieData, [chartHighlightColor, chartErrorColor, chartWarningColor, chartAccent2, chartAccent1], chartTheme]]);
+                    if (languageCanvas) chartJobs.push([languageCanvas, 'bar', [langBars, 'Language Distribution', langGridlines, chartTheme]]);
+                    if (complexityCanvas) chartJobs.push([complexityCanvas, 'bar', [complexityBars, 'Code Quality Metrics', complexityGridlines, chartTheme]]);
+
+                    // Charts are drawn right away, with the monospace fallback until VT323 has loaded, and
+                    // redrawn once it has: the worker redraws its canvases after loading the font itself, and
+                    // canvases drawn here are redrawn when the page's own VT323 face finishes loading.
+                    const chartWorker = createChartWorker();
+                    const mainThreadJobs = chartJobs.filter(([canvas, kind, args]) => renderChart(chartWorker, canvas, kind, args));
+                    if (mainThreadJobs.length > 0 && document.fonts && !document.fonts.check('12px VT323')) {{ // Double Braces
+                        document.fonts.load('12px VT323').then(faces => {{ // Double Braces
+                            if (faces.length > 0) mainThreadJobs.forEach(([canvas, kind, args]) => chartDrawers[kind](canvas.getContext('2d'), canvas.width, canvas.height, ...args));
+                        }}).catch(() => {{}}); // Double Braces - offline: keep the fallback font
+                    }} // End Double Braces
 
                     console.log("Charts initialized.");
 
@@ -833,6 +941,36 @@ class AdvancedReporter:
              return "// Error formatting chart JS data\n"
 
 
+    def _bar_chart_gridlines(self, data, num_labels=5):
+        """Precompute Y-axis gridline fractions and labels for a bar chart."""
+        max_value = max([1] + [item.get("value", 0) for item in data])
+        gridlines = []
+        for i in range(num_labels + 1):
+            label_value = max_value * i / num_labels
+            label = f"{label_value:.0f}" if label_value >= 1 else f"{label_value:.1f}"
+            gridlines.append({"frac": i / num_labels, "label": label})
+        return gridlines
+
+    def _bar_chart_geometry(self, data, spacing_ratio=0.2):
+        """Precompute bar positions/sizes as fractions of the plot area, plus label text."""
+        if not data:
+            return []
+        max_value = max([1] + [item.get("value", 0) for item in data])
+        bar_count = len(data)
+        bar_spacing = spacing_ratio / (bar_count + 1)
+        bar_width = (1 - spacing_ratio) / bar_count
+        bars = []
+        for i, item in enumerate(data):
+            display_value = item.get("origValue", item.get("value", 0))
+            if isinstance(display_value, float) and display_value.is_integer():
+                display_value = int(display_value)  # Match JS number formatting (3.0 -> "3")
+            bars.append({
+                "x": bar_spacing + (bar_width + bar_spacing) * i, "w": bar_width,
+                "h": item.get("value", 0) / max_value,
+                "valueText": str(display_value), "label": item.get("label", ""),
+            })
+        return bars
+
     def _generate_file_details_js(self, template_data):
         """Generate JavaScript for the file details pane, escaping braces for f-string."""
         try:
@@ -852,23 +990,30 @@ class AdvancedReporter:
                     const fileDetailsData = {file_details_json};
                     const pygmentsAvailable = {pygments_available_js};
 
+                    // Look up the detail pane elements once; they don't change between clicks
+                    const detailsDiv = document.getElementById('fileDetails');
+                    const nameEl = document.getElementById('fileDetailsName');
+                    const infoEl = document.getElementById('fileDetailsInfo');
+                    const issuesEl = document.getElementById('fileDetailsIssues');
+                    const codeEl = document.getElementById('fileDetailsCode');
+                    const codePlaceholderEl = document.getElementById('fileDetailsCodePlaceholder');
+
+                    let setupError = null;
+                    if (!detailsDiv || !nameEl || !infoEl || !issuesEl) setupError = "Essential File detail elements missing!";
+                    else if (pygmentsAvailable && !codeEl) setupError = "Pygments enabled, but code <pre> 'fileDetailsCode' missing!";
+                    else if (!pygmentsAvailable && !codePlaceholderEl) setupError = "Pygments disabled, but placeholder <p> 'fileDetailsCodePlaceholder' missing!";
+                    if (setupError) {{ // Double Braces
+                        console.error(setupError);
+                        window.showFileDetails = function() {{}}; // Noop - error already logged once
+                        return;
+                    }} // End Double Braces
+
                     // Make function globally accessible
                     window.showFileDetails = function(displayPathKey) {{ // Double Braces for function body
                         console.log("Attempting showFileDetails for key:", displayPathKey);
                         const normalizedKey = displayPathKey.replace(/^\\/+|\\/+$/, '');
                         const fileData = fileDetailsData[normalizedKey];
 
-                        const detailsDiv = document.getElementById('fileDetails');
-                        const nameEl = document.getElementById('fileDetailsName');
-                        const infoEl = document.getElementById('fileDetailsInfo');
-                        const issuesEl = document.getElementById('fileDetailsIssues');
-                        const codeEl = document.getElementById('fileDetailsCode');
-                        const codePlaceholderEl = document.getElementById('fileDetailsCodePlaceholder');
-
-                        if (!detailsDiv || !nameEl || !infoEl || !issuesEl) {{ console.error("Essential File detail elements missing!"); return; }} // Double Braces
-                        if (pygmentsAvailable && !codeEl) {{ console.error("Pygments enabled, but code <pre> 'fileDetailsCode' missing!"); return; }} // Double Braces
-                        if (!pygmentsAvailable && !codePlaceholderEl) {{ console.error("Pygments disabled, but placeholder <p> 'fileDetailsCodePlaceholder' missing!"); return; }} // Double Braces
-
                         if (!fileData) {{ // Double Braces
                             console.error(`File data not found for key: ${{displayPathKey}} (Normalized: ${{normalizedKey}}).`); // Python interpolation {{}} - OK
                             detailsDiv.style.display = 'block'; nameEl.textContent = 'Error';
@@ -993,13 +1138,14 @@ class AdvancedReporter:
                         // Double braces for JS object literal
                         const data = {{ nodes: nodes, edges: edges }};
 
-                        // Get colors (OK - uses JS functions)
-                        const nodeBgColor = getComputedStyle(document.documentElement).getPropertyValue('--code-bg') || 'rgba(0, 50, 0, 0.7)';
-                        const nodeBorderColor = getComputedStyle(document.documentElement).getPropertyValue('--accent1-color') || '#00FFFF';
-                        const nodeHighlightBg = getComputedStyle(document.documentElement).getPropertyValue('--card-bg') || 'rgba(0, 255, 0, 0.1)';
-                        const nodeHighlightBorder = getComputedStyle(document.documentElement).getPropertyValue('--highlight-color') || '#39FF14';
-                        const edgeColor = getComputedStyle(document.documentElement).getPropertyValue('--accent2-color') || '#FF00FF';
-                        const textColor = getComputedStyle(document.documentElement).getPropertyValue('--text-color') || '#00FF00';
+                        // Get colors (OK - uses JS functions) - one style lookup for all CSS vars
+                        const rootStyle = getComputedStyle(document.documentElement);
+                        const nodeBgColor = rootStyle.getPropertyValue('--code-bg') || 'rgba(0, 50, 0, 0.7)';
+                        const nodeBorderColor = rootStyle.getPropertyValue('--accent1-color') || '#00FFFF';
+                        const nodeHighlightBg = rootStyle.getPropertyValue('--card-bg') || 'rgba(0, 255, 0, 0.1)';
+                        const nodeHighlightBorder = rootStyle.getPropertyValue('--highlight-color') || '#39FF14';
+                        const edgeColor = rootStyle.getPropertyValue('--accent2-color') || '#FF00FF';
+                        const textColor = rootStyle.getPropertyValue('--text-color') || '#00FF00';
 
                         // Double braces needed for the main options object literal and all nested object literals
                         const options = {{
@@ -1073,8 +1219,14 @@ class AdvancedReporter:
 
 
                         // Double braces for resize function body
+                        // Coalesce resize bursts so at most one fit runs per animation frame
+                        let resizeRafId = 0;
                         const resizeObserver = new ResizeObserver(() => {{
-                            network.fit({{ animation: false }}); // Double braces for object literal
+                            if (resizeRafId) cancelAnimationFrame(resizeRafId);
+                            resizeRafId = requestAnimationFrame(() => {{
+                                resizeRafId = 0;
+                                network.fit({{ animation: false }}); // Double braces for object literal
+                            }});
                         }});
                         resizeObserver.observe(graphContainer);
 
@@ -1107,37 +1259,27 @@ class AdvancedReporter:
     def _get_no_graph_js(self, message, is_error=False):
         """Helper to generate JS for when no graph is displayed."""
         message_escaped = message.replace("'", "\\'")
-        # This f-string *only* uses Python interpolation, so no double braces needed here
-        js = f"""
-        // --- Graph JS Placeholder ---
-        (function() {{
-            const graphContainer = document.getElementById('dependencyGraphContainer');
-            const loadingMsg = document.getElementById('graphLoadingMsg');
-            const errorMsgDiv = document.getElementById('graphErrorMsg');
-            if (loadingMsg) {{ loadingMsg.style.display = 'none'; }}
-            const displayDiv = {'errorMsgDiv' if is_error else 'loadingMsg'};
-            if (displayDiv) {{
-                displayDiv.textContent = '{message_escaped}';
-                displayDiv.style.display = 'block';
-                if({is_error} && errorMsgDiv) {{ errorMsgDiv.className = 'error-box'; errorMsgDiv.style.position='relative'; errorMsgDiv.style.top=''; errorMsgDiv.style.left=''; errorMsgDiv.style.transform=''; }}
-                if(graphContainer) {{ graphContainer.style.height = '80px'; }}
-            }} else {{ console.warn("Could not find graph message element to update: {message_escaped}"); }}
-        }})();
-        """
-        return js.strip()
+        return _get_no_graph_js_cached(message_escaped, bool(is_error))
 
     # --- generate_text_report method ---
     # (Keep the previously corrected generate_text_report method from v4.2)
-    def generate_text_report(self, basic_analysis, advanced_analysis):
+    def generate_text_report(self, basic_analysis, advanced_analysis, out=None):
+        """Write the text report to `out` (any text file-like object).
+
+        If `out` is None the report is collected in memory and returned as a string;
+        otherwise it is written straight to `out` and None is returned.
+        """
         self.update_progress("DEBUG: Text report generation not fully implemented.")
-        report_lines = ["Rick's Basic Text Analysis\n", "="*30 + "\n"]
+        buf = out if out is not None else io.StringIO()
+        buf.write("Rick's Basic Text Analysis\n\n")
+        buf.write("="*30 + "\n")
         if basic_analysis:
-            report_lines.append(f"Project: {basic_analysis.get('project_path', 'N/A')}")
+            buf.write(f"\nProject: {basic_analysis.get('project_path', 'N/A')}")
             # ... add more details ...
         if advanced_analysis:
-             report_lines.append("\n" + "="*30 + "\nAdvanced Summary:\n" + "="*30 + "\n")
+             buf.write("\n\n" + "="*30 + "\nAdvanced Summary:\n" + "="*30 + "\n")
              # ... add details ...
-        return "\n".join(report_lines)
+        return buf.getvalue() if out is None else None
 
 
 # Standalone testing block (optional)
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+# Cache Utilities Module for Rick's Code Analyzer
+# Shared helpers for the on-disk caches under ~/.cache/ricks_analyzer (results and compiled templates)
+
+import os
+import json
+import tempfile
+
+
+def write_json_atomic(cache_dir, cache_path, data):
+    """Writes data as JSON to cache_path inside cache_dir (best effort, atomically via rename).
+
+    The entry is written to a temporary file in cache_dir first, so readers never see a
+    half-written cache file. Any failure leaves the previous entry (if any) in place.
+    """
+    temp_path = None
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+        os.replace(temp_path, cache_path)
+    except (OSError, TypeError, ValueError):
+        if temp_path is not None:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+
+
+# Compiled Jinja templates are kept on disk so a fresh process can skip compiling them. The main
+# app and the advanced reporter share this directory; each names its entries with its own prefix.
+TEMPLATE_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "ricks_analyzer", "jinja")
+
+
+def create_template_env(loader, cache_prefix, **options):
+    """Returns a jinja2.Environment for loader with compiled templates cached in TEMPLATE_CACHE_DIR.
+
+    Jinja only checks the template source against cached bytecode, so callers put a version in
+    cache_prefix and bump it whenever their Environment options change how templates compile.
+    Templates are never reloaded from the loader once compiled (auto_reload is off).
+    """
+    import jinja2 # Deferred: only report generation needs it
+    try:
+        os.makedirs(TEMPLATE_CACHE_DIR, exist_ok=True)
+        bytecode_cache = jinja2.FileSystemBytecodeCache(directory=TEMPLATE_CACHE_DIR,
+                                                        pattern=f"__jinja2_{cache_prefix}_%s.cache")
+    except OSError:
+        bytecode_cache = None # Compile in memory only
+    return jinja2.Environment(loader=loader, bytecode_cache=bytecode_cache, auto_reload=False, **options)
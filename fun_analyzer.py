@@ -4,10 +4,47 @@
 
 import os
 import re
+import bisect
+import codecs
+import mmap
+import string
+import itertools
+import heapq
 import random
-import chardet
+try:
+    import cchardet as chardet # C binding of uchardet; same detect() API, much faster
+except ImportError:
+    import chardet
 from collections import defaultdict, Counter
+from operator import itemgetter
 import datetime
+import hashlib
+import json
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from cache_utils import write_json_atomic
+
+try:
+    import re2 # Optional: linear-time matching (no backtracking) for the whole-file scans
+    RE2_AVAILABLE = True
+except ImportError:
+    RE2_AVAILABLE = False
+
+
+def _compile_scanner(pattern, flags=0):
+    """Compiles a whole-file scan pattern with re2 when installed, otherwise with re.
+
+    Patterns re2 can't handle (like the backreference in JERRY_PATTERNS) quietly stay on re.
+    """
+    if RE2_AVAILABLE:
+        try:
+            return re2.compile(('(?i)' if flags & re.IGNORECASE else '') + pattern)
+        except Exception:
+            pass
+    return re.compile(pattern, flags)
+
 
 # Rick & Morty themed keywords/phrases (case-insensitive)
 RICK_KEYWORDS = [
@@ -19,12 +56,14 @@ RICK_KEYWORDS = [
 ]
 
 # Patterns indicative of potentially overly simple or redundant ("Jerry-like") code
+SELF_ASSIGNMENT_PATTERN = r'(\w+)\s*=\s*\1\b'
+SELF_COMPARISON_PATTERN = r'\w+\s*==\s*\w+\b'
 JERRY_PATTERNS = [
     (r'\bif\s+True\b', "if True: condition - always executes"),
     (r'\bwhile\s+True\b', "while True: loop - potentially infinite without break"),
-    (r'(\w+)\s*=\s*\1\b', "Variable assigned to itself (e.g., x = x)"),
+    (SELF_ASSIGNMENT_PATTERN, "Variable assigned to itself (e.g., x = x)"),
     (r'return\s+None\b', "Explicitly returning None (often redundant)"),
-    (r'\w+\s*==\s*\w+\b', "Comparing a variable to itself (e.g., x == x)"), # Very basic check
+    (SELF_COMPARISON_PATTERN, "Comparing a variable to itself (e.g., x == x)"), # Very basic check
 ]
 
 # Common "colorful" words (censored for display)
@@ -33,6 +72,10 @@ SWEAR_WORDS = [
     # Add more as desired, keeping them censored/mild
 ]
 
+# Line comment marker per language, for comment density (simplified)
+LANGUAGE_COMMENT_MARKERS = {'Python': '#', 'JavaScript': '//', 'Java': '//', 'C++': '//', 'C#': '//', 'Ruby': '#', 'PHP': '//'}
+DEFAULT_COMMENT_MARKER = '#'
+
 # TODO/FIXME Markers
 TASK_MARKERS = ['TODO', 'FIXME', 'HACK', 'XXX', 'NOTE']
 
@@ -46,13 +89,118 @@ PERSONALITIES = {
     'Chaotic Neutral': "A mix of everything, inconsistent style. Hard to pin down, like Rick on a bender."
 }
 
+# Files at least this big are decoded straight from a memory map instead of read into a bytes copy
+MMAP_THRESHOLD = 256 * 1024
+
+# Files skipped without being read, judged from the basic analysis stats: no known language,
+# nothing in them, or so big they're almost certainly generated/minified
+SKIP_LANGUAGES = {'Unknown', 'Binary', 'Image'}
+MAX_FUN_FILE_LINES = 50000
+
+# Rick reference context: a window this long, starting this far before the keyword
+REFERENCE_CONTEXT_CHARS = 100
+REFERENCE_CONTEXT_LEAD = 20
+
+# Row cap for the per-occurrence tables in the HTML report (totals still count everything)
+MAX_REPORT_ROWS = 200
+
+# On-disk cache of per-file results: one entry per path and language, valid while the mtime and size
+# stored in it still match the file.
+# Bump FILE_CACHE_VERSION whenever analyze_file's output would change for the same file.
+FILE_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "ricks_analyzer", "fun")
+FILE_CACHE_VERSION = 2
+
+# Below this many files a process pool costs more to start than it saves
+PARALLEL_MIN_FILES = 16
+
+# --- Precompiled Patterns (built once at import, reused for every file) ---
+# One named group per keyword so a single finditer pass identifies which keyword hit.
+# Word boundaries avoid partial matches (like 'rick' in 'brick') unless the keyword has spaces.
+# Phrases get their own pass because they can contain single-word keywords ('pickle rick').
+_RICK_WORD_PATTERN = re.compile(
+    r'\b(?:' + '|'.join(f'(?P<k{i}>{re.escape(k)})' for i, k in enumerate(RICK_KEYWORDS) if ' ' not in k) + r')\b',
+    re.IGNORECASE)
+_RICK_PHRASE_PATTERN = re.compile(
+    '|'.join(f'(?P<k{i}>{re.escape(k)})' for i, k in enumerate(RICK_KEYWORDS) if ' ' in k),
+    re.IGNORECASE)
+_JERRY_PATTERNS_COMPILED = [(_compile_scanner(pattern, re.IGNORECASE), description) for pattern, description in JERRY_PATTERNS]
+# The self-assignment and self-comparison checks are the slowest Jerry patterns (neither is
+# anchored, so they retry inside every word). Both look at "word =/== word", so one pass over
+# candidates anchored at word starts serves both; see _find_word_operator_pairs.
+_SELF_ASSIGNMENT_COMPILED = re.compile(SELF_ASSIGNMENT_PATTERN, re.IGNORECASE)
+_WORD_OPERATOR_PAIR_PATTERN = re.compile(r'\b(\w+)\s*(==?)\s*(?=(\w+)\b)')
+# All swear words in one alternation so the content is scanned once.
+# Escape potential regex characters in the word, handle a run of '*' as one wildcard
+_SWEAR_PATTERN = _compile_scanner(
+    r'\b(?:' + '|'.join(re.sub(r'(?:\\\*)+', lambda _: r'\w*', re.escape(word)) for word in SWEAR_WORDS) + r')\b',
+    re.IGNORECASE)
+# Look for marker at start of comment or after non-alphanumeric chars
+_TASK_MARKER_PATTERNS = [(marker, re.compile(r'(?:\W|^)' + marker + r'[:\s]', re.IGNORECASE)) for marker in TASK_MARKERS]
+
+# Comments (simple version for common languages): //, #, /* ... */ (non-nested), Python """ """, ''' '''
+_COMMENT_REGEX = r'(?P<line_comment>#.*|//.*)|(?P<block_comment>/\*.*?\*/)|(?P<docstring>""".*?"""|\'\'\'.*?\'\'\')'
+# Basic string literals, including template literals
+_STRING_REGEX = r'(?P<string>".*?"|\'.*?\'|`.*?`)'
+_COMMENT_OR_STRING_PATTERN = re.compile(f"{_COMMENT_REGEX}|{_STRING_REGEX}", re.IGNORECASE | re.DOTALL)
+# Segment kinds that count as real comments for task markers (docstrings are excluded)
+_TASK_COMMENT_KINDS = ('line_comment', 'block_comment')
+
+# Lines whose first non-blank text is the comment marker. \s* may run across blank lines,
+# but every match still ends on exactly one comment line.
+_COMMENT_LINE_PATTERNS = {
+    marker: re.compile(r'^\s*' + re.escape(marker), re.MULTILINE)
+    for marker in set(LANGUAGE_COMMENT_MARKERS.values()) | {DEFAULT_COMMENT_MARKER}
+}
+
+# Word tokens for naming style classification (same word boundaries as \b)
+_WORD_TOKEN_PATTERN = re.compile(r'\w+')
+
+_NEWLINE_PATTERN = re.compile('\n')
+
+# UTF-32 BOMs first, since the UTF-32-LE BOM starts with the UTF-16-LE one
+_BOM_ENCODINGS = (
+    (codecs.BOM_UTF32_LE, 'utf-32'), (codecs.BOM_UTF32_BE, 'utf-32'),
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF16_LE, 'utf-16'), (codecs.BOM_UTF16_BE, 'utf-16'),
+)
+
 # --- Helper Functions ---
 
+def extract_comments_and_strings(content):
+    """Scans content once for comments and string literals.
+
+    Returns:
+        List of (kind, start, end, text) tuples in file order, where kind is
+        'line_comment', 'block_comment', 'docstring' or 'string'.
+    """
+    return [(match.lastgroup, match.start(), match.end(), match.group(0))
+            for match in _COMMENT_OR_STRING_PATTERN.finditer(content)]
+
+def compute_line_starts(content):
+    """Returns the sorted offsets of every newline in content (for line_number_at)."""
+    return [match.start() for match in _NEWLINE_PATTERN.finditer(content)]
+
+def line_number_at(line_starts, offset):
+    """1-based line number of offset, same as content[:offset].count('\\n') + 1."""
+    return bisect.bisect_left(line_starts, offset) + 1
+
 def detect_encoding(file_path):
     """Detects the encoding of a file."""
     try:
         with open(file_path, 'rb') as f:
             raw_content = f.read(4096) # Read first 4k bytes
+
+        # Fast paths: a BOM names the encoding outright, and most source files are valid UTF-8
+        for bom, bom_encoding in _BOM_ENCODINGS:
+            if raw_content.startswith(bom):
+                return bom_encoding
+        try:
+            # final=False so a multi-byte character cut off at the 4k boundary still counts as UTF-8
+            codecs.getincrementaldecoder('utf-8')().decode(raw_content, final=False)
+            return 'utf-8'
+        except UnicodeDecodeError:
+            pass
+
         result = chardet.detect(raw_content)
         encoding = result['encoding'] if result and result['encoding'] else 'utf-8'
         # Handle specific cases or provide default
@@ -62,12 +210,22 @@ def detect_encoding(file_path):
     except Exception:
         return 'utf-8' # Default fallback
 
+def _decode_text(raw, encoding):
+    """Decodes a bytes-like buffer like text-mode open() would (errors replaced, universal newlines)."""
+    text = str(raw, encoding, 'replace')
+    if '\r' in text:
+        text = text.replace('\r\n', '\n').replace('\r', '\n')
+    return text
+
 def read_file_content(file_path):
     """Reads file content with detected encoding."""
     encoding = detect_encoding(file_path)
     try:
-        with open(file_path, 'r', encoding=encoding, errors='replace') as f:
-            return f.read()
+        with open(file_path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size >= MMAP_THRESHOLD:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    return _decode_text(mapped, encoding)
+            return _decode_text(f.read(), encoding)
     except Exception as e:
         # Fallback if primary read fails
         try:
@@ -77,23 +235,263 @@ def read_file_content(file_path):
             print(f"ERROR: Could not read file {file_path} with encoding {encoding} or utf-8: {fallback_e}")
             return None # Indicate failure
 
+# --- Per-File Result Cache ---
+
+def _file_cache_entry(file_path, language):
+    """(cache file, [mtime_ns, size] stamp) for file_path, or None if it can't be stat'ed."""
+    try:
+        st = os.stat(file_path)
+    except OSError:
+        return None
+    # The encoding detector and the regex engine can change the result too, so they are part of the key
+    key = f"{FILE_CACHE_VERSION}|{os.path.abspath(file_path)}|{language}|{chardet.__name__}|{RE2_AVAILABLE}"
+    cache_path = os.path.join(FILE_CACHE_DIR, hashlib.blake2b(key.encode('utf-8'), digest_size=20).hexdigest() + ".json")
+    return cache_path, [st.st_mtime_ns, st.st_size]
+
+def load_cached_file_result(cache_path, stamp):
+    """Returns the cached analyze_file result for the file version stamp describes, or None
+    on a miss, a stale entry or an unreadable entry."""
+    try:
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            entry = json.load(f)
+        return entry['result'] if entry['stamp'] == stamp else None
+    except (OSError, ValueError, TypeError, KeyError):
+        return None
+
+def store_cached_file_result(cache_path, stamp, file_result):
+    """Writes an analyze_file result to the cache, replacing the file's older entry (best effort,
+    atomically via rename)."""
+    write_json_atomic(FILE_CACHE_DIR, cache_path, {'stamp': stamp, 'result': file_result})
+
+# --- Per-File Analysis (module level so worker processes can run it) ---
+
+def analyze_file(file_path, language):
+    """Runs every fun detector over a single file.
+
+    Args:
+        file_path: Path of the file to analyze.
+        language: Language name from the basic analysis.
+
+    Returns:
+        Dictionary of plain (picklable) per-file results, or None if the file couldn't be read.
+    """
+    content = read_file_content(file_path)
+    if content is None:
+        return None
+
+    line_starts = compute_line_starts(content) # Shared by every detector's line lookups
+    segments = extract_comments_and_strings(content) # Shared by Rick references and task markers
+    jerry_detections, warnings = detect_jerry_code(file_path, content, line_starts)
+
+    return {
+        'rick_references': find_rick_references(segments, line_starts),
+        'jerry_detections': jerry_detections,
+        'swear_count': count_swear_words(content),
+        'task_markers': count_task_markers(segments),
+        'personality_metrics': gather_personality_metrics(content.splitlines(), language),
+        'warnings': warnings
+    }
+
+def _keyword_context(text_segment, position):
+    """Up to REFERENCE_CONTEXT_CHARS of the segment around a keyword hit, with '...' where cut."""
+    start = max(0, position - REFERENCE_CONTEXT_LEAD)
+    end = start + REFERENCE_CONTEXT_CHARS
+    return ('...' if start > 0 else '') + text_segment[start:end].strip() + ('...' if end < len(text_segment) else '')
+
+def find_rick_references(segments, line_starts):
+    """Find Rick & Morty keywords in comments and strings."""
+    references = []
+    for _kind, start, _end, text_segment in segments:
+        line_number = line_number_at(line_starts, start)
+
+        first_hits = {} # keyword index -> offset of its first hit in the segment
+        for pattern in (_RICK_WORD_PATTERN, _RICK_PHRASE_PATTERN):
+            for m in pattern.finditer(text_segment):
+                first_hits.setdefault(int(m.lastgroup[1:]), m.start())
+        if not first_hits:
+            continue
+
+        for keyword_index in sorted(first_hits): # Keep RICK_KEYWORDS order
+            references.append({
+                'line': line_number,
+                'keyword': RICK_KEYWORDS[keyword_index],
+                'context': _keyword_context(text_segment, first_hits[keyword_index])
+            })
+    return references
+
+def _find_word_operator_pairs(content):
+    """Finds the spans SELF_ASSIGNMENT_PATTERN and SELF_COMPARISON_PATTERN would match, in one pass.
+
+    Candidates are "word = word" / "word == word" pairs starting at a word boundary; the
+    right-hand word is only looked ahead at so it can start the next candidate. Spans
+    follow finditer's non-overlapping rules for each pattern separately.
+
+    Returns:
+        Dictionary mapping each of the two patterns to its list of (start, end) spans.
+    """
+    assignment_spans = []
+    comparison_spans = []
+    assignment_end = comparison_end = 0
+    for match in _WORD_OPERATOR_PAIR_PATTERN.finditer(content):
+        right_word = match.group(3)
+        right_end = match.end(3)
+        if match.group(2) == '==':
+            if match.start(1) >= comparison_end:
+                comparison_spans.append((match.start(1), right_end))
+                comparison_end = right_end
+            continue
+
+        # x = x: the backreference only needs the tail of the left word to equal the right word
+        start = match.end(1) - len(right_word)
+        if start < max(match.start(1), assignment_end):
+            continue
+        tail = content[start:match.end(1)]
+        if tail.isascii() and right_word.isascii():
+            is_same = tail.lower() == right_word.lower()
+        else:
+            is_same = _SELF_ASSIGNMENT_COMPILED.fullmatch(content, start, right_end) is not None
+        if is_same:
+            assignment_spans.append((start, right_end))
+            assignment_end = right_end
+    return {SELF_ASSIGNMENT_PATTERN: assignment_spans, SELF_COMPARISON_PATTERN: comparison_spans}
+
+def detect_jerry_code(file_path, content, line_starts):
+    """Detect patterns that might indicate overly simple or redundant code.
+
+    Returns:
+        Tuple of (detections, warning messages).
+    """
+    detections = []
+    warnings = []
+    pair_spans = None
+    for (pattern_text, _), (pattern, description) in zip(JERRY_PATTERNS, _JERRY_PATTERNS_COMPILED):
+        try: # Regex can sometimes fail on complex patterns
+            if pattern_text in (SELF_ASSIGNMENT_PATTERN, SELF_COMPARISON_PATTERN):
+                if pair_spans is None:
+                    pair_spans = _find_word_operator_pairs(content)
+                spans = pair_spans[pattern_text]
+            else:
+                spans = (match.span() for match in pattern.finditer(content))
+            for start, end in spans:
+                line_number = line_number_at(line_starts, start)
+                detections.append({
+                    'line': line_number,
+                    'description': description,
+                    'match': content[start:end][:80] # Show matched text
+                })
+        except Exception as e:
+             warnings.append(f"Regex warning for Jerry pattern '{description}' in {file_path}: {e}")
+    return detections, warnings
+
+def count_swear_words(content):
+    """Count occurrences of predefined swear words."""
+    # More robust search, ignoring case and ensuring whole words
+    return len(_SWEAR_PATTERN.findall(content))
+
+def count_task_markers(segments):
+    """Find and categorize TODO, FIXME, etc. markers in comments."""
+    markers = {}
+    for kind, _start, _end, comment_text in segments:
+        if kind not in _TASK_COMMENT_KINDS:
+            continue
+
+        for marker, pattern in _TASK_MARKER_PATTERNS:
+            if pattern.search(comment_text):
+                markers[marker] = markers.get(marker, 0) + 1
+                # Optional: Extract the text after the marker
+                # marker_pos = comment_text.upper().find(marker)
+                # task_text = comment_text[marker_pos + len(marker):].strip(': ')[:80]
+    return markers
+
+def gather_personality_metrics(lines, language):
+    """Calculate metrics needed for personality analysis (None for empty files)."""
+    loc = len(lines)
+    if loc == 0: return None
+
+    content = "\n".join(lines)
+
+    # Comment Density (simple line count)
+    marker = LANGUAGE_COMMENT_MARKERS.get(language, DEFAULT_COMMENT_MARKER)
+    comment_lines = len(_COMMENT_LINE_PATTERNS[marker].findall(content))
+
+    # Average Line Length
+    non_empty_lines = [len(line) for line in lines if line and not line.isspace()]
+
+    return {
+        'comment_density': comment_lines / loc,
+        'avg_line_length': sum(non_empty_lines) / len(non_empty_lines) if non_empty_lines else 0,
+        'naming_styles': count_naming_styles(content)
+    }
+
+def count_naming_styles(content):
+    """Count snake_case, camelCase, PascalCase and SCREAMING_SNAKE words in one tokenizer pass.
+
+    Very basic check on variable/function names. A token made only of digits
+    and underscores (like 1_000) counts as both snake and screaming.
+    """
+    snake = camel = pascal = screaming = 0
+    for token in _WORD_TOKEN_PATTERN.findall(content):
+        if not token.isascii():
+            continue
+        if '_' in token:
+            # var_name / VAR_NAME: single underscores between alphanumeric runs
+            if token[0] == '_' or token[-1] == '_' or '__' in token:
+                continue
+            core = token.replace('_', '')
+            if not core.isalnum():
+                continue
+            if core == core.lower():
+                snake += 1
+            if core == core.upper():
+                screaming += 1 # Often constants
+        elif token.isalnum():
+            first = token[0]
+            if first.islower():
+                # varName: lowercase letters, then a capital
+                split_at = len(token) - len(token.lstrip(string.ascii_lowercase))
+                if split_at < len(token) and token[split_at].isupper():
+                    camel += 1
+            elif first.isupper() and len(token) > 1 and not token[1].isupper():
+                pascal += 1 # Often classes
+    return {'snake': snake, 'camel': camel, 'pascal': pascal, 'screaming': screaming}
+
+def classify_personality(density, avg_len, naming_total, naming_max, jerry_hits, hack_count, fixme_count):
+    """Pick a personality from one file's metrics (pure scalar logic, no dict lookups)."""
+    # Simple Heuristics
+    if jerry_hits > 2 and density > 0.2:
+        return 'Simple Jerry'
+    if hack_count > 0 and density < 0.05 and avg_len < 70:
+        return 'Cynical Rick'
+    if fixme_count > 1 and density > 0.15:
+        return 'Anxious Morty'
+    if density > 0.1 and density < 0.25 and naming_total > 10: # Check if naming conventions seem consistent
+        # Basic check for consistency: one style is dominant
+        if naming_max > (naming_total - naming_max) * 1.5: # If largest is 1.5x rest combined
+            return 'Methodical Beth'
+        return 'Chaotic Neutral' # Inconsistent naming
+    if density < 0.08:
+        return 'Overconfident Summer'
+    return 'Chaotic Neutral' # Default fallback
+
 # --- Main Analyzer Class ---
 
 class FunCodeAnalyzer:
     """Provides fun and thematic code analysis."""
 
-    def __init__(self, callback_function=None):
+    def __init__(self, callback_function=None, use_cache=True):
         """Initialize the fun analyzer.
 
         Args:
             callback_function: Function to call for progress updates.
+            use_cache: Reuse per-file results from FILE_CACHE_DIR for unchanged files.
         """
         self.callback = callback_function
+        self.use_cache = use_cache
         self.results = {
             'rick_references': defaultdict(list),
             'jerry_detections': defaultdict(list),
             'swear_counts': defaultdict(int),
-            'task_markers': defaultdict(lambda: defaultdict(int)),
+            'task_markers': {}, # file -> {marker: count}, only for files with markers
             'code_personality': {},
             'overall_fun_score': 0,
             'fun_quote': ""
@@ -101,7 +499,15 @@ class FunCodeAnalyzer:
         # Track stats for personality analysis
         self._file_comment_density = {}
         self._file_avg_line_length = {}
-        self._file_naming_styles = defaultdict(lambda: Counter()) # file -> style -> count
+        self._file_naming_styles = defaultdict(Counter) # file -> style -> count
+        self._basenames = {} # file -> display name, filled once per analysis run
+
+    def _basename(self, file_path):
+        """Display name for a file, from the per-run basename cache."""
+        name = self._basenames.get(file_path)
+        if name is None:
+            name = self._basenames[file_path] = os.path.basename(file_path)
+        return name
 
     def update_progress(self, message):
         """Update progress via callback."""
@@ -122,22 +528,18 @@ class FunCodeAnalyzer:
         """
         self.update_progress("Starting Fun Analysis... Wubba Lubba Dub Dub!")
 
-        files_to_analyze = list(file_stats.keys())
+        work_items = [(file_path, stats.get('language', 'Unknown')) for file_path, stats in file_stats.items()
+                      if not self._should_skip_file(stats)]
+        skipped_count = len(file_stats) - len(work_items)
+        if skipped_count:
+            self.update_progress(f"Skipping {skipped_count} empty, unknown or oversized file(s). Not even Rick cares about those.")
+        self._basenames = {file_path: os.path.basename(file_path) for file_path in file_stats}
 
-        for file_path in files_to_analyze:
-            self.update_progress(f"Fun-alyzing: {os.path.basename(file_path)}")
-            content = read_file_content(file_path)
-            if content is None:
+        for file_path, file_result in self._iter_file_results(work_items):
+            self.update_progress(f"Fun-alyzing: {self._basename(file_path)}")
+            if file_result is None:
                 continue # Skip if file couldn't be read
-
-            language = file_stats[file_path].get('language', 'Unknown')
-            lines = content.splitlines()
-
-            self._find_rick_references(file_path, content)
-            self._detect_jerry_code(file_path, content)
-            self._count_swear_words(file_path, content)
-            self._analyze_task_markers(file_path, content)
-            self._gather_personality_metrics(file_path, lines, language)
+            self._merge_file_result(file_path, file_result)
 
         self._determine_code_personalities(file_stats)
         self._calculate_fun_score()
@@ -146,140 +548,96 @@ class FunCodeAnalyzer:
         self.update_progress("Fun Analysis Complete! Hope you didn't find any Cronenbergs.")
         return self.results
 
-    def _find_rick_references(self, file_path, content):
-        """Find Rick & Morty keywords in comments and strings."""
-        # Regex to find comments (simple version for common languages)
-        # Handles //, #, /* ... */ (non-nested), Python """ """, ''' '''
-        comment_regex = r'(#.*)|(//.*)|(/\*.*?\*/)|("""(.*?)""")|(\'\'\'(.*?)\'\'\')'
-        # Regex to find basic string literals
-        string_regex = r'(".*?")|(\'.*?\')|(`.*?`)' # Includes template literals
-
-        combined_regex = f"({comment_regex})|({string_regex})"
-
-        for match in re.finditer(combined_regex, content, re.IGNORECASE | re.DOTALL):
-            text_segment = match.group(0)
-            line_number = content[:match.start()].count('\n') + 1
-
-            for keyword in RICK_KEYWORDS:
-                # Use word boundaries for keywords to avoid partial matches (like 'rick' in 'brick')
-                # unless the keyword has spaces
-                pattern = r'\b' + re.escape(keyword) + r'\b' if ' ' not in keyword else re.escape(keyword)
-                if re.search(pattern, text_segment, re.IGNORECASE):
-                    self.results['rick_references'][file_path].append({
-                        'line': line_number,
-                        'keyword': keyword,
-                        'context': text_segment[:100].strip() + ('...' if len(text_segment) > 100 else '')
-                    })
-
-    def _detect_jerry_code(self, file_path, content):
-        """Detect patterns that might indicate overly simple or redundant code."""
-        for pattern, description in JERRY_PATTERNS:
-            try: # Regex can sometimes fail on complex patterns
-                for match in re.finditer(pattern, content, re.IGNORECASE):
-                    line_number = content[:match.start()].count('\n') + 1
-                    self.results['jerry_detections'][file_path].append({
-                        'line': line_number,
-                        'description': description,
-                        'match': match.group(0)[:80] # Show matched text
-                    })
-            except Exception as e:
-                 self.update_progress(f"Regex warning for Jerry pattern '{description}' in {file_path}: {e}")
-
-
-    def _count_swear_words(self, file_path, content):
-        """Count occurrences of predefined swear words."""
-        count = 0
-        # More robust search, ignoring case and ensuring whole words
-        for word in SWEAR_WORDS:
-            # Escape potential regex characters in the word, handle '*' as wildcard
-            safe_word = re.escape(word).replace(r'\*', r'\w*')
-            pattern = r'\b' + safe_word + r'\b'
-            matches = re.findall(pattern, content, re.IGNORECASE)
-            count += len(matches)
-        if count > 0:
-            self.results['swear_counts'][file_path] = count
-
-    def _analyze_task_markers(self, file_path, content):
-        """Find and categorize TODO, FIXME, etc. markers in comments."""
-         # Simple comment regex: #, //, /* ... */
-        comment_regex = r'(?:#|//).*|(/\*.*?\*/)'
-        for match in re.finditer(comment_regex, content, re.DOTALL):
-            comment_text = match.group(0)
-            line_number = content[:match.start()].count('\n') + 1
-
-            for marker in TASK_MARKERS:
-                # Look for marker at start of comment or after non-alphanumeric chars
-                pattern = r'(?:\W|^)' + marker + r'[:\s]'
-                if re.search(pattern, comment_text, re.IGNORECASE):
-                    self.results['task_markers'][file_path][marker] += 1
-                    # Optional: Extract the text after the marker
-                    # marker_pos = comment_text.upper().find(marker)
-                    # task_text = comment_text[marker_pos + len(marker):].strip(': ')[:80]
-
-
-    def _gather_personality_metrics(self, file_path, lines, language):
-        """Calculate metrics needed for personality analysis."""
-        loc = len(lines)
-        if loc == 0: return
-
-        # Comment Density (simple line count)
-        comment_lines = 0
-        comment_markers = {'Python': '#', 'JavaScript': '//', 'Java': '//', 'C++': '//', 'C#': '//', 'Ruby': '#', 'PHP': '//'} # Simplified
-        marker = comment_markers.get(language, '#')
-        for line in lines:
-            if line.strip().startswith(marker):
-                comment_lines += 1
-        self._file_comment_density[file_path] = comment_lines / loc
-
-        # Average Line Length
-        non_empty_lines = [len(line) for line in lines if line.strip()]
-        self._file_avg_line_length[file_path] = sum(non_empty_lines) / len(non_empty_lines) if non_empty_lines else 0
-
-        # Naming Styles (very basic check on variable/function names)
-        # Look for patterns like var_name, varName, VAR_NAME
-        content = "\n".join(lines)
-        snake_case = len(re.findall(r'\b[a-z0-9]+(?:_[a-z0-9]+)+\b', content))
-        camel_case = len(re.findall(r'\b[a-z]+(?:[A-Z][a-z0-9]*)+\b', content))
-        pascal_case = len(re.findall(r'\b[A-Z][a-z0-9]+(?:[A-Z][a-z0-9]*)*\b', content)) # Often classes
-        screaming_snake = len(re.findall(r'\b[A-Z0-9]+(?:_[A-Z0-9]+)+\b', content)) # Often constants
-
-        self._file_naming_styles[file_path]['snake'] = snake_case
-        self._file_naming_styles[file_path]['camel'] = camel_case
-        self._file_naming_styles[file_path]['pascal'] = pascal_case
-        self._file_naming_styles[file_path]['screaming'] = screaming_snake
-
+    @staticmethod
+    def _should_skip_file(stats):
+        """True if a file's basic stats say the fun detectors would find nothing worth reporting."""
+        if stats.get('language', 'Unknown') in SKIP_LANGUAGES:
+            return True
+        lines = stats.get('lines')
+        return lines is not None and (lines == 0 or lines > MAX_FUN_FILE_LINES)
+
+    def _iter_file_results(self, work_items):
+        """Yield (file_path, analyze_file result) in file order, from the cache where possible."""
+        if not self.use_cache:
+            yield from self._iter_analyzed_files(work_items)
+            return
+
+        cache_entries = [_file_cache_entry(file_path, language) for file_path, language in work_items]
+        cached_results = [load_cached_file_result(*cache_entry) if cache_entry else None for cache_entry in cache_entries]
+        misses = [item for item, cached in zip(work_items, cached_results) if cached is None]
+        if len(misses) < len(work_items):
+            self.update_progress(f"Reusing cached results for {len(work_items) - len(misses)} unchanged file(s).")
+
+        analyzed = self._iter_analyzed_files(misses)
+        for (file_path, _), cache_entry, cached in zip(work_items, cache_entries, cached_results):
+            if cached is not None:
+                yield file_path, cached
+                continue
+            _, file_result = next(analyzed)
+            if file_result is not None and cache_entry:
+                store_cached_file_result(*cache_entry, file_result)
+            yield file_path, file_result
+
+    def _iter_analyzed_files(self, work_items):
+        """Yield (file_path, analyze_file result) in file order, using worker processes for big projects."""
+        if len(work_items) >= PARALLEL_MIN_FILES and (os.cpu_count() or 1) > 1:
+            done = 0
+            try:
+                # 'spawn' avoids forking the GUI process while its other threads hold locks
+                with ProcessPoolExecutor(mp_context=multiprocessing.get_context('spawn')) as executor:
+                    paths = [file_path for file_path, _ in work_items]
+                    languages = [language for _, language in work_items]
+                    for file_result in executor.map(analyze_file, paths, languages, chunksize=8):
+                        yield work_items[done][0], file_result
+                        done += 1
+                return
+            except (OSError, BrokenProcessPool) as e:
+                self.update_progress(f"Parallel fun analysis unavailable ({e}), continuing in a single process...")
+                work_items = work_items[done:]
+
+        for file_path, language in work_items:
+            yield file_path, analyze_file(file_path, language)
+
+    def _merge_file_result(self, file_path, file_result):
+        """Fold one file's analyze_file result into self.results and the personality stats."""
+        for warning in file_result['warnings']:
+            self.update_progress(warning)
+        if file_result['rick_references']:
+            self.results['rick_references'][file_path] = file_result['rick_references']
+        if file_result['jerry_detections']:
+            self.results['jerry_detections'][file_path] = file_result['jerry_detections']
+        if file_result['swear_count'] > 0:
+            self.results['swear_counts'][file_path] = file_result['swear_count']
+        if file_result['task_markers']:
+            self.results['task_markers'][file_path] = file_result['task_markers']
+
+        metrics = file_result['personality_metrics']
+        if metrics is not None:
+            self._file_comment_density[file_path] = metrics['comment_density']
+            self._file_avg_line_length[file_path] = metrics['avg_line_length']
+            self._file_naming_styles[file_path].update(metrics['naming_styles'])
 
     def _determine_code_personalities(self, file_stats):
         """Assign a personality to each analyzed file."""
-        for file_path in file_stats.keys():
-            if file_path not in self._file_comment_density: continue # Skip if metrics weren't gathered
-
-            density = self._file_comment_density[file_path]
-            avg_len = self._file_avg_line_length[file_path]
-            naming = self._file_naming_styles[file_path]
-            tasks = self.results['task_markers'][file_path]
-            jerry_hits = len(self.results['jerry_detections'].get(file_path, []))
-
-            # Simple Heuristics
-            if jerry_hits > 2 and density > 0.2:
-                personality = 'Simple Jerry'
-            elif tasks.get('HACK', 0) > 0 and density < 0.05 and avg_len < 70:
-                personality = 'Cynical Rick'
-            elif tasks.get('FIXME', 0) > 1 and density > 0.15:
-                 personality = 'Anxious Morty'
-            elif density > 0.1 and density < 0.25 and sum(naming.values()) > 10: # Check if naming conventions seem consistent
-                 # Basic check for consistency: one style is dominant
-                 styles = sorted(naming.items(), key=lambda item: item[1], reverse=True)
-                 if len(styles) > 0 and styles[0][1] > sum(s[1] for s in styles[1:]) * 1.5 : # If largest is 1.5x rest combined
-                     personality = 'Methodical Beth'
-                 else:
-                      personality = 'Chaotic Neutral' # Inconsistent naming
-            elif density < 0.08:
-                 personality = 'Overconfident Summer'
-            else:
-                 personality = 'Chaotic Neutral' # Default fallback
-
-            self.results['code_personality'][file_path] = personality
+        comment_density = self._file_comment_density
+        avg_line_length = self._file_avg_line_length
+        naming_styles = self._file_naming_styles
+        task_markers = self.results['task_markers']
+        jerry_detections = self.results['jerry_detections']
+        code_personality = self.results['code_personality']
+        no_tasks = {}
+
+        for file_path in file_stats:
+            density = comment_density.get(file_path)
+            if density is None: continue # Skip if metrics weren't gathered
+
+            naming_counts = naming_styles[file_path].values()
+            tasks = task_markers.get(file_path, no_tasks)
+            code_personality[file_path] = classify_personality(
+                density, avg_line_length[file_path],
+                sum(naming_counts), max(naming_counts, default=0),
+                len(jerry_detections.get(file_path, ())),
+                tasks.get('HACK', 0), tasks.get('FIXME', 0))
 
 
     def _calculate_fun_score(self):
@@ -296,9 +654,14 @@ class FunCodeAnalyzer:
         score += sum(self.results['swear_counts'].values()) * 1
 
         # Task markers show awareness, but too many FIXMEs might be Morty-level anxiety
-        score += sum(v.get('TODO', 0) + v.get('NOTE', 0) for v in self.results['task_markers'].values()) * 0.5
-        score -= sum(v.get('FIXME', 0) for v in self.results['task_markers'].values()) * 1
-        score += sum(v.get('HACK', 0) for v in self.results['task_markers'].values()) * 1 # Hacks are Rick-like
+        todo_note_total = fixme_total = hack_total = 0
+        for v in self.results['task_markers'].values():
+            todo_note_total += v.get('TODO', 0) + v.get('NOTE', 0)
+            fixme_total += v.get('FIXME', 0)
+            hack_total += v.get('HACK', 0)
+        score += todo_note_total * 0.5
+        score -= fixme_total * 1
+        score += hack_total * 1 # Hacks are Rick-like
 
         # Personalities influence score
         personality_counts = Counter(self.results['code_personality'].values())
@@ -346,7 +709,7 @@ class FunCodeAnalyzer:
             summary.append(f"Found {ref_count} Rick & Morty references!")
             for file, refs in self.results['rick_references'].items():
                 if refs:
-                     summary.append(f"  - {os.path.basename(file)}: {len(refs)} references (e.g., '{refs[0]['keyword']}' on line {refs[0]['line']})")
+                     summary.append(f"  - {self._basename(file)}: {len(refs)} references (e.g., '{refs[0]['keyword']}' on line {refs[0]['line']})")
 
         # Jerry Detections
         jerry_count = sum(len(v) for v in self.results['jerry_detections'].values())
@@ -355,7 +718,7 @@ class FunCodeAnalyzer:
              count = 0
              for file, detects in self.results['jerry_detections'].items():
                  if detects and count < 3: # Show details for first few files
-                     summary.append(f"  - {os.path.basename(file)}: {len(detects)} instances (e.g., '{detects[0]['description']}' on line {detects[0]['line']})")
+                     summary.append(f"  - {self._basename(file)}: {len(detects)} instances (e.g., '{detects[0]['description']}' on line {detects[0]['line']})")
                      count += 1
              if jerry_count > 3 : summary.append("   (and more...)")
 
@@ -364,9 +727,9 @@ class FunCodeAnalyzer:
         swear_total = sum(self.results['swear_counts'].values())
         if swear_total > 0:
             summary.append(f"\nDetected {swear_total} instances of *colorful* language.")
-            top_files = sorted(self.results['swear_counts'].items(), key=lambda item: item[1], reverse=True)[:3]
+            top_files = heapq.nlargest(3, self.results['swear_counts'].items(), key=itemgetter(1))
             for file, count in top_files:
-                 summary.append(f"  - {os.path.basename(file)}: {count} instances")
+                 summary.append(f"  - {self._basename(file)}: {count} instances")
 
         # Task Markers
         task_total = sum(sum(f.values()) for f in self.results['task_markers'].values())
@@ -388,37 +751,45 @@ class FunCodeAnalyzer:
                 if personality == personality_counts.most_common(1)[0][0]:
                      example_file = next((f for f, p in self.results['code_personality'].items() if p == personality), None)
                      if example_file:
-                         summary.append(f"    (e.g., {os.path.basename(example_file)})")
+                         summary.append(f"    (e.g., {self._basename(example_file)})")
 
 
         summary.append("\n--- END OF FUN ANALYSIS ---")
         return "\n".join(summary)
 
-    def get_html_report_data(self):
-        """Formats the fun analysis results for the HTML template."""
-        # Flatten references and detections for easier looping in template
-        all_refs = []
+    def _iter_rick_reference_rows(self):
+        """Yield flattened Rick reference rows for the report table, file by file."""
         for file, refs in self.results['rick_references'].items():
+            file_name = self._basename(file)
             for ref in refs:
-                all_refs.append({
-                    'file': os.path.basename(file),
+                yield {
+                    'file': file_name,
                     'line': ref['line'],
                     'keyword': ref['keyword'],
                     'context': ref['context']
-                })
+                }
 
-        all_jerry = []
+    def _iter_jerry_detection_rows(self):
+        """Yield flattened Jerry detection rows for the report table, file by file."""
         for file, detects in self.results['jerry_detections'].items():
+            file_name = self._basename(file)
             for det in detects:
-                all_jerry.append({
-                    'file': os.path.basename(file),
+                yield {
+                    'file': file_name,
                     'line': det['line'],
                     'description': det['description'],
                     'match': det['match']
-                })
+                }
+
+    def get_html_report_data(self):
+        """Formats the fun analysis results for the HTML template."""
+        # Flatten references and detections for easier looping in template, only materializing
+        # the rows the report shows (the data is kept and may be rendered more than once)
+        all_refs = list(itertools.islice(self._iter_rick_reference_rows(), MAX_REPORT_ROWS))
+        all_jerry = list(itertools.islice(self._iter_jerry_detection_rows(), MAX_REPORT_ROWS))
 
         # Structure swear counts
-        swear_list = [{'file': os.path.basename(f), 'count': c}
+        swear_list = [{'file': self._basename(f), 'count': c}
                       for f, c in self.results['swear_counts'].items()]
         swear_list.sort(key=lambda x: x['count'], reverse=True)
 
@@ -433,13 +804,15 @@ class FunCodeAnalyzer:
         # Group files by personality
         personality_groups = defaultdict(list)
         for file, personality in self.results['code_personality'].items():
-            personality_groups[personality].append(os.path.basename(file))
+            personality_groups[personality].append(self._basename(file))
 
         return {
             'fun_score': self.results['overall_fun_score'],
             'fun_quote': self.results['fun_quote'],
             'rick_references': all_refs,
+            'rick_reference_total': sum(len(refs) for refs in self.results['rick_references'].values()),
             'jerry_detections': all_jerry,
+            'jerry_total': sum(len(detects) for detects in self.results['jerry_detections'].values()),
             'swear_counts': swear_list,
             'swear_total': sum(self.results['swear_counts'].values()),
             'task_markers': marker_list,
@@ -451,6 +824,7 @@ class FunCodeAnalyzer:
 
 # --- Standalone Testing ---
 if __name__ == "__main__":
+    multiprocessing.freeze_support() # Frozen builds: let spawned analysis workers run as workers
     print("Running Fun Analyzer Standalone Test...")
 
     # Create dummy files for testing
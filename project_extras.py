@@ -6,21 +6,144 @@ import os
 import subprocess
 import json
 import sys
+import functools
+import hashlib
+import tempfile
+import time
+import threading
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from cache_utils import write_json_atomic
+
+try:
+    import ijson # Optional: parse safety's JSON as it streams out instead of buffering it
+    IJSON_AVAILABLE = True
+except ImportError:
+    IJSON_AVAILABLE = False
 
 # --- Dependency Security Scanning (Python/Safety) ---
 
+# Print safety progress to stdout when run_safety_check has no callback (set False for quiet batch scans)
+VERBOSE = True
+
+# Candidate dependency files, mapped to their priority (lowest wins)
+REQUIREMENTS_CANDIDATES = {'requirements.txt': 0, 'requirements.in': 1, 'pyproject.toml': 2}
+
+
 def find_requirements_file(project_path):
     """Finds common Python requirements files."""
-    common_files = ['requirements.txt', 'requirements.in', 'pyproject.toml']
-    for filename in common_files:
-        req_path = os.path.join(project_path, filename)
-        if os.path.isfile(req_path):
-            return req_path, filename
-    return None, None
-
-def run_safety_check(project_path, callback_function=None):
-    """Runs 'safety check' on the project's requirements file."""
+    # One directory listing instead of a stat per candidate. Names are compared case-insensitively,
+    # as the old per-candidate exists() probe effectively was on Windows/macOS (Requirements.txt);
+    # an exact-case match wins if a case-sensitive filesystem has both.
+    try:
+        matches = {}
+        with os.scandir(project_path) as entries:
+            for entry in entries:
+                priority = REQUIREMENTS_CANDIDATES.get(entry.name.lower())
+                if priority is not None and entry.is_file():
+                    if priority not in matches or entry.name in REQUIREMENTS_CANDIDATES:
+                        matches[priority] = entry
+    except OSError:
+        for filename in REQUIREMENTS_CANDIDATES:
+            req_path = os.path.join(project_path, filename)
+            if os.path.isfile(req_path):
+                return req_path, filename
+        return None, None
+    if not matches:
+        return None, None
+    best = matches[min(matches)]
+    return os.path.join(project_path, best.name), best.name
+
+# Scan results are reused while the dependency file is unchanged and the entry is fresh enough
+# for vulnerability database updates to show up. Bump SAFETY_CACHE_VERSION if results change shape.
+SAFETY_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "ricks_analyzer", "safety")
+SAFETY_CACHE_VERSION = 1
+SAFETY_CACHE_MAX_AGE = 24 * 60 * 60 # seconds
+
+
+def _safety_cache_path(req_path, req_filename):
+    """Cache file for the current contents of req_path, or None if it can't be read."""
+    try:
+        with open(req_path, 'rb') as f:
+            data = f.read()
+    except OSError:
+        return None
+    digest = hashlib.sha256(f"{SAFETY_CACHE_VERSION}|{req_filename}|".encode('utf-8') + data).hexdigest()
+    return os.path.join(SAFETY_CACHE_DIR, digest + ".json")
+
+
+def load_cached_safety_result(cache_path):
+    """Returns a cached scan result younger than SAFETY_CACHE_MAX_AGE, or None."""
+    try:
+        if time.time() - os.path.getmtime(cache_path) > SAFETY_CACHE_MAX_AGE:
+            return None
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def store_cached_safety_result(cache_path, results):
+    """Writes a scan result to the cache (best effort, atomically via rename)."""
+    write_json_atomic(SAFETY_CACHE_DIR, cache_path, results)
+
+# sys.executable -> 'safety --version' output, so repeat scans skip the probe subprocess
+_SAFETY_VERSION_CACHE = {}
+
+
+def get_safety_version():
+    """Returns the installed safety version string, or None if safety can't be run.
+
+    Only successful probes are cached, so installing safety mid-session is picked up on the next scan.
+    """
+    version = _SAFETY_VERSION_CACHE.get(sys.executable)
+    if version is None:
+        version_process = subprocess.run([sys.executable, '-m', 'safety', '--version'], capture_output=True, text=True, check=False)
+        if version_process.returncode != 0:
+            return None
+        version = _SAFETY_VERSION_CACHE[sys.executable] = version_process.stdout.strip()
+    return version
+
+
+class _HeadKeepingReader:
+    """Binary stream wrapper that remembers the first few bytes read (for error messages)."""
+
+    def __init__(self, stream, keep_bytes=500):
+        self.stream = stream
+        self.keep_bytes = keep_bytes
+        self.head = b''
+        self.bytes_read = 0
+
+    def read(self, size=-1):
+        data = self.stream.read(size)
+        if len(self.head) < self.keep_bytes:
+            self.head += data[:self.keep_bytes - len(self.head)]
+        self.bytes_read += len(data)
+        return data
+
+    def head_text(self):
+        return self.head.decode('utf-8', errors='replace')
+
+
+def _iter_safety_vulnerabilities(stdout_reader):
+    """Yields each vulnerability entry of safety's JSON list, streaming with ijson when available."""
+    if IJSON_AVAILABLE:
+        yield from ijson.items(stdout_reader, 'item')
+    else:
+        yield from json.loads(stdout_reader.read() or b'null') or []
+
+
+# Vulnerability IDs ignored by every scan (passed as --ignore in _run_safety_scan)
+SAFETY_IGNORED_IDS = ('41002', '39462')
+
+
+def run_safety_check(project_path, callback_function=None, use_cache=True):
+    """Runs 'safety check' on the project's requirements file.
+
+    With use_cache, a recent result for identical requirements contents is returned
+    without running safety, and successful scans (Secure/Vulnerable) are cached.
+    """
     results = {
         'vulnerabilities': [],
         'error': None,
@@ -29,10 +152,13 @@ def run_safety_check(project_path, callback_function=None):
         'status': 'Not Run'
     }
 
+    # Without a callback, progress goes to stdout only when VERBOSE is set
+    verbose = callback_function is not None or VERBOSE
+
     def update_progress(msg):
         if callback_function:
             callback_function(f"  [Safety] {msg}")
-        else:
+        elif verbose:
             print(f"  [Safety] {msg}")
 
     update_progress("Looking for Python dependency file...")
@@ -45,15 +171,33 @@ def run_safety_check(project_path, callback_function=None):
         return results
 
     results['checked_file'] = req_filename
-    update_progress(f"Found: {req_filename}. Checking for 'safety' tool...")
+    cache_path = _safety_cache_path(req_path, req_filename) if use_cache else None
+    if cache_path:
+        cached = load_cached_safety_result(cache_path)
+        if cached is not None:
+            if verbose: update_progress(f"Found: {req_filename}. Unchanged since the last scan, reusing cached result ({cached.get('status')}).")
+            return cached
+
+    results = _run_safety_scan(req_path, req_filename, results, update_progress, verbose)
+    if cache_path and results['status'] in ('Secure', 'Vulnerable'):
+        store_cached_safety_result(cache_path, results)
+    return results
+
+
+def _run_safety_scan(req_path, req_filename, results, update_progress, verbose=True):
+    """Scans req_path with the 'python -m safety' command and fills in results.
+
+    When not verbose, formatted progress messages are skipped entirely rather than built and discarded.
+    """
+    if verbose: update_progress(f"Found: {req_filename}. Checking for 'safety' tool...")
 
     try:
         # Check if safety is installed and get version
-        version_process = subprocess.run([sys.executable, '-m', 'safety', '--version'], capture_output=True, text=True, check=False)
-        if version_process.returncode != 0:
+        safety_version = get_safety_version()
+        if safety_version is None:
              raise FileNotFoundError("Safety command failed")
-        results['safety_version'] = version_process.stdout.strip()
-        update_progress(f"Using safety version: {results['safety_version']}")
+        results['safety_version'] = safety_version
+        if verbose: update_progress(f"Using safety version: {results['safety_version']}")
 
         # Command to run safety check and output JSON
         # Using sys.executable ensures we use the python/pip associated with the script runner
@@ -64,53 +208,63 @@ def run_safety_check(project_path, callback_function=None):
             sys.executable, '-m', 'safety', 'check',
             '--file', req_path,
             '--output', 'json',
-            '--ignore', '41002', # Ignore common 'requests' http verb warning
-            '--ignore', '39462'  # Ignore older Jinja2 escape warning if present
+            '--ignore', SAFETY_IGNORED_IDS[0], # Ignore common 'requests' http verb warning
+            '--ignore', SAFETY_IGNORED_IDS[1]  # Ignore older Jinja2 escape warning if present
         ]
 
-        update_progress(f"Running command: {' '.join(command)}")
-        process = subprocess.run(command, capture_output=True, text=True, check=False) # Don't check=True, handle errors manually
-
-        if process.returncode == 0:
+        if verbose:
+            update_progress(f"Running command: {' '.join(command)}")
+        # stderr goes to a temp file so a chatty stderr can't block while stdout is being streamed
+        with tempfile.TemporaryFile() as stderr_file:
+            process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=stderr_file) # Handle errors manually
+            stdout_reader = _HeadKeepingReader(process.stdout)
+            vulnerabilities = []
+            parse_error = None
+            try:
+                # Safety JSON output structure (list of vulnerabilities):
+                # [ [package_name, affected_versions, installed_version, description, vulnerability_id], ... ]
+                for vuln in _iter_safety_vulnerabilities(stdout_reader):
+                    if len(vuln) >= 5:
+                        vulnerabilities.append({
+                            'package': vuln[0],
+                            'affected': vuln[1],
+                            'installed': vuln[2],
+                            'description': vuln[3],
+                            'id': vuln[4]
+                        })
+                    elif verbose:
+                        update_progress(f"Skipping malformed vulnerability data: {vuln}")
+            except Exception as e:
+                parse_error = e
+            stdout_reader.read() # Drain anything left so safety can exit
+            process.stdout.close()
+            returncode = process.wait()
+            stderr_file.seek(0)
+            stderr_text = stderr_file.read().decode('utf-8', errors='replace')
+
+        if returncode == 0:
             update_progress("Safety check completed successfully (no vulnerabilities found).")
             results['status'] = 'Secure'
-            # Try parsing output even if return code is 0, might contain scan metadata
-            try:
-                 scan_data = json.loads(process.stdout)
-                 # You could extract scan metadata here if needed
-            except json.JSONDecodeError:
-                 update_progress("Could not parse safety JSON output (empty?).")
-        elif process.stdout:
+            # Output was parsed above even with return code 0; it might contain scan metadata
+            if parse_error is not None or stdout_reader.bytes_read == 0:
+                update_progress("Could not parse safety JSON output (empty?).")
+        elif stdout_reader.bytes_read:
             update_progress("Safety check completed. Found potential vulnerabilities.")
             results['status'] = 'Vulnerable'
-            try:
-                parsed_json = json.loads(process.stdout)
-                # Safety JSON output structure (list of vulnerabilities):
-                # [ [package_name, affected_versions, installed_version, description, vulnerability_id], ... ]
-                for vuln in parsed_json:
-                     if len(vuln) >= 5:
-                         results['vulnerabilities'].append({
-                             'package': vuln[0],
-                             'affected': vuln[1],
-                             'installed': vuln[2],
-                             'description': vuln[3],
-                             'id': vuln[4]
-                         })
-                     else:
-                          update_progress(f"Skipping malformed vulnerability data: {vuln}")
-
-            except json.JSONDecodeError as json_err:
-                results['error'] = f"Failed to parse safety JSON output: {json_err}. Raw output:\n{process.stdout[:500]}"
+            if parse_error is None:
+                results['vulnerabilities'] = vulnerabilities
+            elif isinstance(parse_error, ValueError) or (IJSON_AVAILABLE and isinstance(parse_error, ijson.JSONError)):
+                results['error'] = f"Failed to parse safety JSON output: {parse_error}. Raw output:\n{stdout_reader.head_text()}"
+                results['status'] = 'Error'
+                update_progress(results['error'])
+            else:
+                results['error'] = f"Unexpected error processing safety output: {parse_error}"
                 results['status'] = 'Error'
                 update_progress(results['error'])
-            except Exception as e:
-                 results['error'] = f"Unexpected error processing safety output: {e}"
-                 results['status'] = 'Error'
-                 update_progress(results['error'])
         else:
             # Handle cases where safety fails to run (e.g., file not found by safety itself)
-            error_output = process.stderr if process.stderr else "Unknown error (no stdout/stderr)"
-            results['error'] = f"Safety check command failed (return code {process.returncode}). Error: {error_output.strip()}"
+            error_output = stderr_text if stderr_text else "Unknown error (no stdout/stderr)"
+            results['error'] = f"Safety check command failed (return code {returncode}). Error: {error_output.strip()}"
             results['status'] = 'Error'
             update_progress(results['error'])
 
@@ -128,37 +282,82 @@ def run_safety_check(project_path, callback_function=None):
 
 # --- Dependency Graph Data Preparation ---
 
+@functools.lru_cache(maxsize=8192)
+def _norm_join(base_dir, module_parts):
+    """Cached os.path.normpath(os.path.join(base_dir, *module_parts)); module_parts is a tuple."""
+    return os.path.normpath(os.path.join(base_dir, *module_parts))
+
+def _label(file_path_abs, project_root):
+    """Node label: path relative to the project root, falling back to the basename."""
+    try:
+        relative_path = os.path.relpath(file_path_abs, project_root)
+    except ValueError: # Handle cases where file is outside project path (e.g. temp files?)
+        relative_path = os.path.basename(file_path_abs)
+    return relative_path.replace('\\', '/')
+
+
 def prepare_graph_data(import_graph, project_path):
     """Formats the import graph for vis.js, handling simple relative imports."""
-    nodes = []
     edges = []
-    node_map = {} # Map full file path to unique node ID
-    path_to_node_id = {} # Reverse map for easier lookup
+    seen_edges = set() # (from, to) pairs already in edges
 
     project_root_norm = os.path.normpath(project_path)
 
     # --- Pass 1: Create nodes for all analyzed files ---
-    node_id_counter = 1
-    for file_path_abs in import_graph.keys():
-        # Ensure keys are absolute paths for reliable matching
-        if not os.path.isabs(file_path_abs): continue # Should be absolute from analyzer
-
-        node_id = node_id_counter
-        node_map[file_path_abs] = node_id
-        path_to_node_id[file_path_abs] = node_id # Store reverse mapping
-
-        # Try to get relative path, fallback to basename
-        try:
-            relative_path = os.path.relpath(file_path_abs, project_root_norm)
-        except ValueError: # Handle cases where file is outside project path (e.g. temp files?)
-            relative_path = os.path.basename(file_path_abs)
-
-        nodes.append({
-            'id': node_id,
-            'label': relative_path.replace('\\', '/'), # Display relative path with forward slashes
-            'title': file_path_abs # Tooltip shows full path
-        })
-        node_id_counter += 1
+    # Keys should be absolute from the analyzer; anything else can't be matched reliably
+    node_map = {file_path_abs: node_id for node_id, file_path_abs in
+                enumerate((path for path in import_graph if os.path.isabs(path)), 1)}
+    nodes = [{
+        'id': node_id,
+        'label': _label(file_path_abs, project_root_norm), # Relative path with forward slashes
+        'title': file_path_abs # Tooltip shows full path
+    } for file_path_abs, node_id in node_map.items()]
+
+    # Map each importable path stem to its analyzed file, so one dict lookup resolves a module
+    # as either "<stem>.py" or "<stem>/__init__.py" (a .py module wins over a package, as before)
+    resolvable_paths = {}
+    for file_path_abs in node_map:
+        if os.path.basename(file_path_abs) == "__init__.py":
+            resolvable_paths[os.path.dirname(file_path_abs)] = file_path_abs
+    for file_path_abs in node_map:
+        if file_path_abs.endswith(".py"):
+            resolvable_paths[file_path_abs[:-3]] = file_path_abs
+
+    parent_chain_cache = {} # dir -> [dir, parent, grandparent, ..., root]
+
+    def parent_chain(directory):
+        """Returns the directory's ancestor chain, computing it once per importer directory."""
+        chain = parent_chain_cache.get(directory)
+        if chain is None:
+            chain = [directory]
+            while True:
+                parent = os.path.dirname(chain[-1])
+                if parent == chain[-1]:
+                    break
+                chain.append(parent)
+            parent_chain_cache[directory] = chain
+        return chain
+
+    def candidate_path(module_name, importer_dir_abs):
+        """Maps a module name to the path stem it would live at inside the project."""
+        # 1. Handle Relative Imports (starting with '.')
+        if module_name.startswith('.'):
+            stripped = module_name.lstrip('.')
+            level = len(module_name) - len(stripped)
+            module_name = stripped
+
+            # Calculate base directory based on levels: go up N-1 levels for N dots
+            # (climbing past the filesystem root stays at the root)
+            parents = parent_chain(importer_dir_abs)
+            current_dir = parents[min(level - 1, len(parents) - 1)]
+
+            # Construct potential path parts
+            module_parts = tuple(module_name.split('.')) if module_name else ()
+            return _norm_join(current_dir, module_parts)
+
+        # 2. Handle Absolute-like Imports (treat as relative to project root)
+        # Add more sophisticated checks here if needed (e.g., checking sys.path, src layout)
+        return _norm_join(project_root_norm, tuple(module_name.split('.')))
 
     # --- Pass 2: Create edges ---
     for importer_path_abs, imported_modules in import_graph.items():
@@ -167,80 +366,44 @@ def prepare_graph_data(import_graph, project_path):
 
         importer_dir_abs = os.path.dirname(importer_path_abs)
 
-        for module_name in imported_modules:
-            if not module_name: continue # Skip empty module names
-
-            target_path_abs = None
-            target_id = None
-
-            # --- Attempt to resolve module name to an analyzed file path ---
-
-            # 1. Handle Relative Imports (starting with '.')
-            if module_name.startswith('.'):
-                level = 0
-                while module_name.startswith('.'):
-                    level += 1
-                    module_name = module_name[1:]
-
-                # Calculate base directory based on levels
-                current_dir = importer_dir_abs
-                for _ in range(level - 1): # Go up N-1 levels for N dots
-                    current_dir = os.path.dirname(current_dir)
-
-                # Construct potential path parts
-                module_parts = module_name.split('.') if module_name else []
-                potential_path_abs = os.path.normpath(os.path.join(current_dir, *module_parts))
-
-                # Check if this path (as .py or as package/__init__.py) exists in our node map
-                potential_py_file = potential_path_abs + ".py"
-                potential_init_file = os.path.join(potential_path_abs, "__init__.py")
-
-                if potential_py_file in node_map:
-                    target_path_abs = potential_py_file
-                elif potential_init_file in node_map:
-                    target_path_abs = potential_init_file
-
-            # 2. Handle Absolute-like Imports (treat as relative to project root)
-            else:
-                module_parts = module_name.split('.')
-                potential_path_abs = os.path.normpath(os.path.join(project_root_norm, *module_parts))
-
-                 # Check if this path (as .py or as package/__init__.py) exists in our node map
-                potential_py_file = potential_path_abs + ".py"
-                potential_init_file = os.path.join(potential_path_abs, "__init__.py")
-
-                if potential_py_file in node_map:
-                    target_path_abs = potential_py_file
-                elif potential_init_file in node_map:
-                    target_path_abs = potential_init_file
-
-                # Add more sophisticated checks here if needed (e.g., checking sys.path, src layout)
-
-
-            # --- If a matching analyzed file was found, add the edge ---
-            if target_path_abs:
-                target_id = node_map.get(target_path_abs)
-                if target_id:
-                    # Avoid self-loops (though unlikely with imports)
-                    if importer_id != target_id:
-                        edges.append({'from': importer_id, 'to': target_id})
-                # else: # Debugging if path found but not in node_map
-                #     print(f"WARN: Resolved path '{target_path_abs}' not found in node_map.")
-
-            # else: # Debugging: Module not resolved to an internal file
-            #    print(f"DEBUG: No internal file match for module '{module_name}' from '{os.path.basename(importer_path_abs)}'")
-
-
-    # Deduplicate edges (in case logic adds the same edge twice)
-    unique_edges = []
-    seen_edges = set()
-    for edge in edges:
-        edge_tuple = (edge['from'], edge['to'])
-        if edge_tuple not in seen_edges:
-            unique_edges.append(edge)
-            seen_edges.add(edge_tuple)
-
-    return {'nodes': nodes, 'edges': unique_edges}
+        # Work out every module's candidate path, then resolve them all against the
+        # analyzed files (as .py or as package/__init__.py) in one pass
+        # (sorted, so edge order doesn't depend on set iteration order)
+        candidate_paths = [candidate_path(module_name, importer_dir_abs)
+                           for module_name in sorted(imported_modules) if module_name] # Skip empty module names
+        target_ids = [node_map[resolvable_paths[path]] for path in candidate_paths if path in resolvable_paths]
+
+        for target_id in target_ids:
+            # Avoid self-loops (though unlikely with imports) and duplicate edges
+            edge_key = (importer_id, target_id)
+            if importer_id != target_id and edge_key not in seen_edges:
+                seen_edges.add(edge_key)
+                edges.append({'from': importer_id, 'to': target_id})
+
+    return {'nodes': nodes, 'edges': edges}
+
+
+# --- Combined Runner ---
+def run_extras(project_path, import_graph, callback_function=None):
+    """
+    Runs the safety scan and graph preparation concurrently.
+    The safety scan spends most of its time waiting on the subprocess, so the
+    graph can be built in the meantime. Skips the graph if import_graph is empty.
+    Returns a (safety_results, graph_data) tuple.
+    """
+    if callback_function:
+        callback_lock = threading.Lock()
+        def locked_callback(message):
+            # Both workers may report at once; keep their messages whole
+            with callback_lock:
+                callback_function(message)
+    else:
+        locked_callback = None
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        safety_future = executor.submit(run_safety_check, project_path, locked_callback)
+        graph_future = executor.submit(prepare_graph_data, import_graph, project_path) if import_graph else None
+        return safety_future.result(), graph_future.result() if graph_future else None
 
 
 # --- Standalone Testing ---
@@ -252,19 +415,16 @@ if __name__ == "__main__":
         f.write("flask==1.0.0\n") # Known vulnerable version
         f.write("requests>=2.20\n")
 
-    print("\n--- Testing Safety Check ---")
-    safety_results = run_safety_check("extras_test", print)
-    print("\nSafety Results:")
-    print(json.dumps(safety_results, indent=2))
-
-    print("\n--- Testing Graph Prep ---")
+    print("\n--- Testing Safety Check & Graph Prep ---")
     # Dummy import graph
     dummy_graph = {
         os.path.abspath("extras_test/app.py"): {'utils', 'models.user', 'flask'},
         os.path.abspath("extras_test/utils.py"): {'os', 'datetime'},
         os.path.abspath("extras_test/models/user.py"): {'sqlalchemy'}
     }
-    graph_data = prepare_graph_data(dummy_graph, os.path.abspath("extras_test"))
+    safety_results, graph_data = run_extras("extras_test", dummy_graph, print)
+    print("\nSafety Results:")
+    print(json.dumps(safety_results, indent=2))
     print("\nGraph Data for vis.js:")
     print(json.dumps(graph_data, indent=2))
 
@@ -3,70 +3,174 @@
 # Combines the original analyzer with advanced analysis and reporting capabilities
 
 import os
+import codecs
+import functools
+import hashlib
+import heapq
+import importlib
+import importlib.util
+import io
+import json
+import re
 import tkinter as tk
 from tkinter import filedialog, messagebox, font, ttk
 import threading
+import queue
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 import time
-from collections import defaultdict, Counter
-import random
-import webbrowser  # Needed for opening report
-import platform    # Needed for _open_report_in_browser
-import subprocess  # Needed for _open_report_in_browser
+from collections import Counter, deque
+from operator import itemgetter
 import traceback # For detailed error reporting
 
-# Import necessary packages for HTML report
-try:
+from cache_utils import create_template_env, write_json_atomic
+
+# Optional packages and the analysis modules are only located here, not imported: importing
+# pygments, jinja2, chardet and the analyzers is deferred to first use so the window opens sooner.
+def _module_available(module_name):
+    try:
+        return importlib.util.find_spec(module_name) is not None
+    except (ImportError, ValueError):
+        return False
+
+# Packages needed for the HTML report
+PYGMENTS_AVAILABLE = _module_available('pygments')
+JINJA2_AVAILABLE = _module_available('jinja2')
+# Encoding detector _chardet_detect() will use: cchardet when installed, else chardet (either provides detect())
+CHARDET_BACKEND = next((name for name in ('cchardet', 'chardet') if _module_available(name)), None)
+CHARDET_AVAILABLE = CHARDET_BACKEND is not None
+
+REPORT_PACKAGES_AVAILABLE = all([PYGMENTS_AVAILABLE, JINJA2_AVAILABLE, CHARDET_AVAILABLE])
+
+# Analysis modules (advanced_analyzer and fun_analyzer import chardet/cchardet at import)
+ADVANCED_MODULES_AVAILABLE = (_module_available('advanced_analyzer') and _module_available('advanced_reporter')
+                              and CHARDET_AVAILABLE)
+FUN_MODULE_AVAILABLE = _module_available('fun_analyzer') and CHARDET_AVAILABLE
+EXTRAS_MODULE_AVAILABLE = _module_available('project_extras')
+
+
+@functools.lru_cache(maxsize=None)
+def _sample_highlighting():
+    """Imports Pygments on first use; returns (highlight, formatter, formatter CSS, lexer lookup)."""
     from pygments import highlight
-    from pygments.lexers import get_lexer_for_filename, guess_lexer
+    from pygments.lexers import guess_lexer
     from pygments.formatters import HtmlFormatter
     from pygments.util import ClassNotFound
-    PYGMENTS_AVAILABLE = True
-except ImportError:
-    PYGMENTS_AVAILABLE = False
-
-try:
-    import jinja2
-    JINJA2_AVAILABLE = True
-except ImportError:
-    JINJA2_AVAILABLE = False
-
-try:
-    import chardet
-    CHARDET_AVAILABLE = True
-except ImportError:
-    CHARDET_AVAILABLE = False
-
-REPORT_PACKAGES_AVAILABLE = all([PYGMENTS_AVAILABLE, JINJA2_AVAILABLE, CHARDET_AVAILABLE])
+    try:
+        # Optional: pygments_cache avoids scanning Pygments' whole lexer registry per lookup
+        from pygments_cache import get_lexer_for_filename
+    except ImportError:
+        from pygments.lexers import get_lexer_for_filename
+
+    # One formatter for every code sample (no line numbers). Token colours come from CSS classes,
+    # emitted once per report as the formatter CSS, instead of an inline style on every token.
+    # ('highlight' is already a report class, hence the cssclass.)
+    formatter = HtmlFormatter(style='monokai', cssclass='codehilite', linenos=False)
+
+    @functools.lru_cache(maxsize=128)
+    def lexer_for_key(lexer_key):
+        return get_lexer_for_filename(lexer_key, stripall=True)
+
+    def get_sample_lexer(file_path, content):
+        """Lexer for a code sample, looked up once per file extension (extensionless files by name)."""
+        file_name = os.path.basename(file_path)
+        extension = os.path.splitext(file_name)[1]
+        try:
+            return lexer_for_key(f"sample{extension}" if extension else file_name)
+        except ClassNotFound:
+            return guess_lexer(content, stripall=True)
 
-# Import advanced modules if available
-try:
-    from advanced_analyzer import AdvancedCodeAnalyzer
-    from advanced_reporter import AdvancedReporter
-    ADVANCED_MODULES_AVAILABLE = True
-except ImportError:
-    ADVANCED_MODULES_AVAILABLE = False
-    AdvancedCodeAnalyzer = None # Define as None if not available
-    AdvancedReporter = None     # Define as None if not available
-
-# Import fun module if available
-try:
-    from fun_analyzer import FunCodeAnalyzer
-    FUN_MODULE_AVAILABLE = True
-except ImportError:
-    FUN_MODULE_AVAILABLE = False
-    FunCodeAnalyzer = None # Define as None if not available
-
-# Import extras module if available
-try:
-    from project_extras import run_safety_check, prepare_graph_data
-    EXTRAS_MODULE_AVAILABLE = True
-except ImportError:
-    EXTRAS_MODULE_AVAILABLE = False
-    run_safety_check = None # Define as None if not available
-    prepare_graph_data = None # Define as None if not available
+    return highlight, formatter, formatter.get_style_defs('.codehilite'), get_sample_lexer
 
 MAX_FILE_LINES = 100000 # Maximum lines of code for a file to be analyzed
+MAX_FILE_BYTES = MAX_FILE_LINES * 120 # Files bigger than this are skipped unopened; ~120 bytes/line is generous for source
+UI_POLL_INTERVAL_MS = 100 # How often the Tk thread picks up work posted by analysis threads
+BASIC_ANALYSIS_WORKERS = min(32, (os.cpu_count() or 1) * 4) # Threads reading files during basic analysis
+CURSOR_BLINK_MS = 700 # Header cursor blink period, close to a terminal's
+TYPEWRITER_CHARS_PER_TICK = 4 # Characters the typewriter effect reveals per after() tick
+CONSOLE_MAX_LINES = 2000 # Older console lines are dropped; Tk Text slows down as it grows
+PROGRESS_INTERVAL_S = 0.5 # Minimum time between basic analysis progress lines
+CODE_SAMPLE_LINES = 150 # Longer report code samples are truncated to this many lines
+REPORT_WRITE_BUFFER = 1 << 16 # Bytes buffered per write() when streaming a report into its file
+# Basic comment detection for the line counts (can be improved). The markers are a tuple so a
+# single C-level startswith() call tests them all.
+LINE_COMMENT_MARKERS = ('#', '//', '--', '%') # Add more as needed
+BLOCK_COMMENT_START = '/*'
+BLOCK_COMMENT_END = '*/'
+LINE_CHUNK_CHARS = 1 << 16 # Roughly how much text is decoded and split into lines at a time
+
+ENCODING_SAMPLE_BYTES = 1024 * 50 # Bytes read from each file to decide its encoding
+CHARDET_SAMPLE_BYTES = 8192 # Only this much of the sample is handed to chardet
+NEWLINE_BYTE_ENCODINGS = frozenset({'ascii', 'utf-8', 'utf-8-sig'}) # codecs.lookup() names whose b'\n' is always a line end
+
+def detect_sample_encoding(sample_bytes):
+    """Returns a chardet-style {'encoding', 'confidence'} dict for a file's leading bytes.
+
+    Most source files are ASCII or UTF-8, which a strict decode confirms far faster than
+    chardet's statistical probers; chardet only sees a bounded head of anything else.
+    """
+    if sample_bytes.isascii():
+        return {'encoding': 'ascii', 'confidence': 1.0}
+    if sample_bytes.startswith(codecs.BOM_UTF8):
+        return {'encoding': 'UTF-8-SIG', 'confidence': 1.0}
+    try:
+        # Not final: the sample may end partway through a multi-byte character
+        codecs.getincrementaldecoder('utf-8')().decode(sample_bytes, final=False)
+        return {'encoding': 'utf-8', 'confidence': 0.99}
+    except UnicodeDecodeError:
+        detected = _chardet_detect()(sample_bytes[:CHARDET_SAMPLE_BYTES])
+        # cchardet can report a confidence of None
+        return {'encoding': detected['encoding'], 'confidence': detected['confidence'] or 0.0}
+
+@functools.lru_cache(maxsize=None)
+def _chardet_detect():
+    """Returns the detect() of CHARDET_BACKEND (cchardet, the C binding of uchardet, when installed,
+    else chardet); imported on first use."""
+    return importlib.import_module(CHARDET_BACKEND).detect
+
+
+# Per-file basic analysis results, reused while a file's mtime and size are unchanged. There is one
+# entry per file path; the mtime and size it was made from are stored inside it, so an edited file's
+# entry is checked on load and overwritten on store rather than left behind.
+# Bump BASIC_CACHE_VERSION whenever _scan_basic_file's output would change for the same file.
+BASIC_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "ricks_analyzer", "basic")
+BASIC_CACHE_VERSION = 3
+
+def _basic_cache_path(file_path):
+    """Cache file holding the basic analysis result for file_path."""
+    # The limits and the active encoding detector change the result too, so they are part of the key
+    key = (f"{BASIC_CACHE_VERSION}|{os.path.abspath(file_path)}"
+           f"|{MAX_FILE_LINES}|{MAX_FILE_BYTES}|{CHARDET_BACKEND}")
+    return os.path.join(BASIC_CACHE_DIR, hashlib.blake2b(key.encode('utf-8'), digest_size=20).hexdigest() + ".json")
+
+def _file_stamp(file_path):
+    """[mtime_ns, size] of file_path, or None if it can't be stat'ed."""
+    try:
+        st = os.stat(file_path)
+    except OSError:
+        return None
+    return [st.st_mtime_ns, st.st_size]
+
+def load_cached_basic_result(cache_path, st):
+    """Returns the cached _analyze_basic_file result if it was made from the file version st describes.
+
+    None on a miss, a stale entry (file changed since) or an unreadable entry.
+    """
+    try:
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            entry = json.load(f)
+        if entry['stamp'] != [st.st_mtime_ns, st.st_size]:
+            return None
+        messages, counted_encodings, file_entry, too_long = entry['result']
+        return messages, counted_encodings, file_entry, too_long
+    except (OSError, ValueError, TypeError, KeyError):
+        return None
+
+def store_cached_basic_result(cache_path, st, result):
+    """Writes an _analyze_basic_file result for the file version st describes, replacing any older entry
+    (best effort, atomically via rename)."""
+    write_json_atomic(BASIC_CACHE_DIR, cache_path, {'stamp': [st.st_mtime_ns, st.st_size], 'result': result})
+
 
 # Retro color scheme
 COLORS = {
@@ -95,6 +199,11 @@ RICK_QUOTES = [
     "Holy *burp* crap! Did you let a Gazorpazorp write this?",
 ]
 
+def pick_rick_quote():
+    """Picks a random quote; random is imported here, on first use, rather than at startup."""
+    import random
+    return random.choice(RICK_QUOTES)
+
 # File extensions to analyze
 CODE_EXTENSIONS = {
     'Python': ['.py', '.pyw'],
@@ -112,101 +221,44 @@ CODE_EXTENSIONS = {
     'SQL': ['.sql'],
 }
 
+# Inverted CODE_EXTENSIONS for one-lookup language detection
+EXT_TO_LANG = {ext: lang for lang, exts in CODE_EXTENSIONS.items() for ext in exts}
+
 # Directories to ignore
-IGNORE_DIRS = { # Use a set for faster lookups
+IGNORE_DIRS = frozenset({ # A set for O(1) lookups; frozen since it's never modified
     '.git', '.svn', '.hg', 'node_modules', '__pycache__',
     '.venv', 'venv', 'env', '.env', 'build', 'dist',
     '.idea', '.vscode', '.DS_Store'
-}
+})
 
-# --- TEMPLATES (Keep as they are) ---
-HTML_TEMPLATE = '''
-<!DOCTYPE html>
-<html lang="en">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>Rick's Code Analysis Report</title>
-    <style>
-        @import url('https://fonts.googleapis.com/css2?family=VT323&display=swap');
-
-        :root {
-            --bg-color: #000000;
-            --text-color: #00FF00;
-            --highlight-color: #39FF14;
-            --warning-color: #FF6000;
-            --error-color: #FF0000;
-            --accent1-color: #00FFFF;
-            --accent2-color: #FF00FF;
-        }
+# --- TEMPLATES ---
+# Report templates live in templates/ next to this script and are only read when a report is made.
+# They are compiled on first use and reused for every later report; the bytecode cache (see
+# cache_utils.create_template_env) also keeps compiled templates on disk so a fresh run can skip compiling them.
+TEMPLATES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "templates")
+# Bump TEMPLATE_CACHE_VERSION whenever the Environment options below change how templates compile
+TEMPLATE_CACHE_VERSION = 2
 
-        body {
-            background-color: var(--bg-color);
-            color: var(--text-color);
-            font-family: 'VT323', monospace;
-            font-size: 18px;
-            line-height: 1.6;
-            margin: 0;
-            padding: 20px;
-            position: relative;
-            overflow-x: hidden;
-        }
+def _create_template_env():
+    import jinja2 # Deferred to the first report
+    # Autoescape: file names, code context and quotes are escaped by the compiled template itself;
+    # pre-rendered HTML (code samples, Pygments CSS) is marked |safe in the templates
+    return create_template_env(jinja2.FileSystemLoader(TEMPLATES_DIR), f"v{TEMPLATE_CACHE_VERSION}",
+                               autoescape=jinja2.select_autoescape(['html']), cache_size=-1)
 
-        body::before {
-            content: "";
-            position: fixed;
-            top: 0;
-            left: 0;
-            width: 100%;
-            height: 100%;
-            background: linear-gradient(transparent 50%, rgba(0, 0, 0, 0.1) 50%);
-            background-size: 100% 4px;
-            pointer-events: none;
-            z-index: 1000;
-            animation: scanlines 0.2s linear infinite;
-        }
+@functools.lru_cache(maxsize=None)
+def _template_env():
+    return _create_template_env()
 
-        @keyframes scanlines {
-            0% { background-position: 0 0; }
-            100% { background-position: 0 4px; }
-        }
+def get_report_template(template_name):
+    """Returns the compiled jinja2 template for a file in TEMPLATES_DIR."""
+    return _template_env().get_template(template_name)
+
+
+# Report file names keep only alphanumerics, '_' and '-'. \w is Unicode-aware, so this keeps
+# exactly what str.isalnum() does (accented letters, other scripts) and strips the rest in one C-level sub().
+SAFE_NAME_STRIP_RE = re.compile(r'[^\w-]+')
 
-        .container { max-width: 1200px; margin: 0 auto; border: 2px solid var(--text-color); border-radius: 8px; padding: 20px; position: relative; box-shadow: 0 0 20px rgba(0, 255, 0, 0.5); }
-        h1, h2, h3, h4 { color: var(--accent1-color); text-shadow: 0 0 5px var(--accent1-color); border-bottom: 2px solid var(--accent2-color); padding-bottom: 5px; margin-top: 30px; }
-        h1 { font-size: 42px; text-align: center; margin-bottom: 30px; animation: flicker 3s infinite; }
-        @keyframes flicker { 0%, 19.999%, 22%, 62.999%, 64%, 64.999%, 70%, 100% { opacity: 1; text-shadow: 0 0 10px var(--accent1-color); } 20%, 21.999%, 63%, 63.999%, 65%, 69.999% { opacity: 0.8; text-shadow: none; } }
-        pre { background-color: rgba(0, 255, 0, 0.1); border: 1px solid var(--text-color); border-radius: 5px; padding: 10px; overflow-x: auto; font-family: 'Courier New', monospace; }
-        table { width: 100%; border-collapse: collapse; margin: 20px 0; font-family: 'VT323', monospace; }
-        th { background-color: rgba(0, 255, 255, 0.2); border: 1px solid var(--text-color); padding: 10px; text-align: left; color: var(--accent1-color); }
-        td { border: 1px solid var(--text-color); padding: 10px; }
-        tr:nth-child(even) { background-color: rgba(0, 255, 0, 0.05); }
-        .progress-container { width: 100%; background-color: rgba(0, 255, 0, 0.1); border-radius: 5px; margin: 10px 0; height: 20px; }
-        .progress-bar { height: 100%; background-color: var(--accent1-color); border-radius: 5px; transition: width 0.5s; position: relative; text-align: center; color: var(--bg-color); font-weight: bold; line-height: 20px; }
-        .card { border: 1px solid var(--text-color); border-radius: 5px; padding: 15px; margin-bottom: 20px; background-color: rgba(0, 255, 0, 0.05); box-shadow: 0 0 10px rgba(0, 255, 0, 0.2); }
-        .quote { font-style: italic; color: var(--warning-color); border-left: 3px solid var(--warning-color); padding-left: 15px; margin: 20px 0; }
-        .highlight { color: var(--highlight-color); font-weight: bold; text-shadow: 0 0 3px var(--highlight-color); }
-        .warning { color: var(--warning-color); font-weight: bold; }
-        .error { color: var(--error-color); font-weight: bold; }
-        .badge { display: inline-block; padding: 3px 10px; background-color: var(--accent2-color); color: var(--bg-color); border-radius: 10px; font-size: 14px; margin-right: 5px; }
-        .stat-container { display: flex; flex-wrap: wrap; justify-content: space-between; margin: 20px 0; }
-        .stat-box { flex: 1; min-width: 200px; background-color: rgba(0, 255, 0, 0.05); border: 1px solid var(--text-color); border-radius: 5px; padding: 15px; margin: 10px; text-align: center; }
-        .stat-value { font-size: 36px; color: var(--accent1-color); margin: 10px 0; text-shadow: 0 0 5px var(--accent1-color); }
-        .stat-label { font-size: 16px; color: var(--text-color); }
-        .footer { text-align: center; margin-top: 50px; padding-top: 20px; border-top: 2px solid var(--accent2-color); font-size: 14px; color: var(--accent2-color); }
-        .rickroll { position: absolute; top: 10px; right: 10px; width: 100px; height: 100px; border-radius: 50%; background: var(--accent2-color); display: flex; align-items: center; justify-content: center; animation: spin 10s linear infinite; cursor: pointer; z-index: 1001; }
-        .rickroll::before { content: "RICK'S SEAL OF APPROVAL"; font-size: 10px; text-align: center; color: var(--bg-color); }
-        @keyframes spin { from { transform: rotate(0deg); } to { transform: rotate(360deg); } }
-        @media (max-width: 768px) { .stat-container { flex-direction: column; } .stat-box { margin: 5px 0; } }
-    </style>
-</head>
-<body> <div class="container"> <div class="rickroll" onclick="alert('Never gonna give you up, never gonna let you down!')"></div> <h1>Rick's Code Analysis Report</h1> <div class="card"> <h2>Project Summary</h2> <div class="stat-container"> <div class="stat-box"> <div class="stat-label">Total Files</div> <div class="stat-value">{{ total_files }}</div> </div> <div class="stat-box"> <div class="stat-label">Total Lines</div> <div class="stat-value">{{ total_lines }}</div> </div> <div class="stat-box"> <div class="stat-label">Code Lines</div> <div class="stat-value">{{ code_lines }}</div> </div> <div class="stat-box"> <div class="stat-label">Comment Lines</div> <div class="stat-value">{{ comment_lines }}</div> </div> </div> <div class="quote">{{ rick_quote }}</div> <p>Project: <span class="highlight">{{ project_path }}</span></p> <p>Analysis Date: <span class="highlight">{{ analysis_date }}</span></p> </div> <div class="card"> <h2>Language Distribution</h2> <table> <thead> <tr> <th>Language</th> <th>Files</th> <th>Percentage</th> </tr> </thead> <tbody> {% for lang in language_stats %} <tr> <td>{{ lang.language }}</td> <td>{{ lang.count }}</td> <td> <div class="progress-container"> <div class="progress-bar" style="width: {{ lang.percentage }}%">{{ lang.percentage }}%</div> </div> </td> </tr> {% else %} <tr><td colspan="3">No language data available.</td></tr> {% endfor %} </tbody> </table> </div> <div class="card"> <h2>Largest Files</h2> <table> <thead> <tr> <th>File</th> <th>Lines</th> <th>Language</th> </tr> </thead> <tbody> {% for file in largest_files %} <tr> <td>{{ file.name }}</td> <td>{{ file.lines }}</td> <td>{{ file.language }}</td> </tr> {% else %} <tr><td colspan="3">No file data available.</td></tr> {% endfor %} </tbody> </table> </div> {% if code_samples %} <div class="card"> <h2>Code Samples</h2> {% for sample in code_samples %} <div class="code-sample"> <h3>{{ sample.filename }}</h3> <div>{{ sample.code | safe }}</div> </div> {% endfor %} </div> {% endif %} <div class="footer"> <p>Generated by Rick's Code Analyzer © {{ current_year }} Wubba Lubba Dub Dub Inc.</p> <p>If this analysis seems wrong, it's because you're wrong *burp*</p> </div> </div> <script> document.addEventListener('DOMContentLoaded', function() { setInterval(function() { const elements = document.querySelectorAll('h1, h2, h3, .stat-value'); if (elements.length > 0) { const randomElement = elements[Math.floor(Math.random() * elements.length)]; if (randomElement) { randomElement.style.opacity = '0.5'; setTimeout(function() { if(randomElement) randomElement.style.opacity = '1'; }, 100); } } }, 3000); }); </script> </body> </html>
-'''
-
-FUN_HTML_TEMPLATE = '''
-<!DOCTYPE html>
-<html lang="en">
-<head> <meta charset="UTF-8"> <meta name="viewport" content="width=device-width, initial-scale=1.0"> <title>Rick's Fun Analysis Report</title> <style> @import url('https://fonts.googleapis.com/css2?family=VT323&display=swap'); :root { --bg-color: #000000; --text-color: #00FF00; --highlight-color: #39FF14; --warning-color: #FF6000; --error-color: #FF0000; --accent1-color: #00FFFF; --accent2-color: #FF00FF; --meeseeks-blue: #40E0D0; } body { background-color: var(--bg-color); color: var(--text-color); font-family: 'VT323', monospace; font-size: 18px; line-height: 1.6; margin: 0; padding: 20px; position: relative; overflow-x: hidden; background-image: radial-gradient(rgba(0, 255, 0, 0.1) 1px, transparent 1px); background-size: 10px 10px; } body::before { content: ""; position: fixed; top: 0; left: 0; width: 100%; height: 100%; background: linear-gradient(transparent 50%, rgba(0, 0, 0, 0.1) 50%); background-size: 100% 4px; pointer-events: none; z-index: 1000; animation: scanlines 0.2s linear infinite; } @keyframes scanlines { 0% { background-position: 0 0; } 100% { background-position: 0 4px; } } .container { max-width: 1200px; margin: 0 auto; border: 2px solid var(--accent1-color); border-radius: 8px; padding: 20px; position: relative; box-shadow: 0 0 30px rgba(0, 255, 255, 0.6); background: rgba(0, 10, 0, 0.85); } h1, h2, h3, h4 { color: var(--accent2-color); text-shadow: 0 0 8px var(--accent2-color); border-bottom: 2px solid var(--accent1-color); padding-bottom: 5px; margin-top: 30px; } h1 { font-size: 48px; text-align: center; margin-bottom: 30px; animation: flicker-magenta 4s infinite alternate; } @keyframes flicker-magenta { 0%, 100% { opacity: 1; text-shadow: 0 0 10px var(--accent2-color); } 50% { opacity: 0.7; text-shadow: none; } } table { width: 100%; border-collapse: collapse; margin: 20px 0; font-family: 'VT323', monospace; } th { background-color: rgba(255, 0, 255, 0.2); border: 1px solid var(--accent2-color); padding: 10px; text-align: left; color: var(--accent2-color); } td { border: 1px solid var(--text-color); padding: 10px; } tr:nth-child(even) { background-color: rgba(0, 255, 0, 0.05); } .card { border: 1px solid var(--text-color); border-radius: 5px; padding: 15px; margin-bottom: 20px; background-color: rgba(0, 255, 0, 0.05); box-shadow: 0 0 10px rgba(0, 255, 0, 0.2); } .quote { font-style: italic; color: var(--accent1-color); border-left: 3px solid var(--accent1-color); padding: 15px; margin: 20px 0; font-size: 24px; text-align: center; background: rgba(0, 255, 255, 0.1); } .highlight { color: var(--highlight-color); font-weight: bold; } .jerry-code { color: var(--warning-color); font-weight: bold; background-color: rgba(255, 96, 0, 0.1); padding: 2px 4px; border-radius: 3px; } .swear-alert { color: var(--error-color); font-weight: bold; animation: pulse-red 1.5s infinite; } @keyframes pulse-red { 0%, 100% { text-shadow: 0 0 5px var(--error-color); } 50% { text-shadow: 0 0 15px var(--error-color); } } .task-marker { font-weight: bold; padding: 2px 6px; border-radius: 4px; margin-right: 5px; color: var(--bg-color); } .task-TODO { background-color: #FFFF00; } .task-FIXME { background-color: #FF6000; } .task-HACK { background-color: #FF00FF; } .task-XXX { background-color: #FF0000; } .task-NOTE { background-color: #00FFFF; } .score-container { text-align: center; margin: 30px 0; } .score-value { font-size: 72px; color: var(--accent1-color); font-weight: bold; text-shadow: 0 0 15px var(--accent1-color), 0 0 30px var(--accent1-color); display: inline-block; padding: 10px 20px; border: 2px solid var(--accent1-color); border-radius: 10px; background: rgba(0, 0, 0, 0.5); } .score-label { font-size: 24px; margin-top: 10px; color: var(--text-color); } .personality-group { margin-bottom: 15px; } .personality-name { color: var(--accent2-color); font-size: 20px; margin-bottom: 5px; } .personality-desc { font-style: italic; color: var(--accent1-color); margin-left: 10px; font-size: 16px;} .personality-files { list-style: square; margin-left: 30px; } .footer { text-align: center; margin-top: 50px; padding-top: 20px; border-top: 2px solid var(--accent1-color); font-size: 14px; color: var(--accent1-color); } #meeseeks-box { position: fixed; bottom: 20px; right: 20px; width: 80px; height: 80px; background-color: var(--meeseeks-blue); border: 3px solid #00A0A0; border-radius: 10px; cursor: pointer; display: flex; align-items: center; justify-content: center; font-family: 'VT323', monospace; font-size: 14px; color: black; text-align: center; box-shadow: 0 0 15px var(--meeseeks-blue); transition: transform 0.2s ease-in-out; z-index: 1001; } #meeseeks-box:hover { transform: scale(1.1) rotate(5deg); } #meeseeks-box::before { content: "Press Me!"; font-weight: bold; } #meeseeks-tooltip { visibility: hidden; width: 180px; background-color: rgba(0,0,0,0.9); color: var(--meeseeks-blue); text-align: center; border-radius: 6px; padding: 10px; position: fixed; z-index: 1002; bottom: 110px; right: 20px; opacity: 0; transition: opacity 0.3s; border: 1px solid var(--meeseeks-blue); font-size: 16px; } #meeseeks-tooltip.show { visibility: visible; opacity: 1; } .code-context { font-family: 'Courier New', monospace; font-size: 0.9em; background-color: rgba(0,0,0,0.3); padding: 5px; border-radius: 3px; display: inline-block; max-width: 90%; overflow: hidden; text-overflow: ellipsis; white-space: nowrap; } </style> </head> <body> <div class="container"> <h1>Rick's Fun Analysis Report</h1> <div class="card"> <h2>Overall Fun Score</h2> <div class="score-container"> <span class="score-value">{{ fun_score }}</span> <div class="score-label">Out of 100 Schwifties</div> </div> <div class="quote">{{ fun_quote }}</div> </div> {% if rick_references %} <div class="card"> <h2>Rick & Morty References</h2> <p>Found {{ rick_references|length }} glorious references to the multiverse's best show!</p> <table> <thead><tr><th>File</th><th>Line</th><th>Keyword</th><th>Context</th></tr></thead> <tbody> {% for ref in rick_references %} <tr> <td>{{ ref.file }}</td> <td>{{ ref.line }}</td> <td><span class="highlight">{{ ref.keyword }}</span></td> <td><code class="code-context">{{ ref.context }}</code></td> </tr> {% endfor %} </tbody> </table> </div> {% endif %} {% if jerry_detections %} <div class="card"> <h2>Potential "Jerry Code" Detections</h2> <p>Uh oh, looks like {{ jerry_detections|length }} instances of possibly redundant or overly simple code slipped in.</p> <table> <thead><tr><th>File</th><th>Line</th><th>Description</th><th>Matched Code</th></tr></thead> <tbody> {% for det in jerry_detections %} <tr> <td>{{ det.file }}</td> <td>{{ det.line }}</td> <td>{{ det.description }}</td> <td><code class="jerry-code">{{ det.match }}</code></td> </tr> {% endfor %} </tbody> </table> </div> {% endif %} {% if swear_total > 0 %} <div class="card"> <h2>Colorful Language Detector</h2> <p>Detected a total of <span class="swear-alert">{{ swear_total }}</span> swear words! Someone's channeling their inner Rick.</p> <table> <thead><tr><th>File</th><th>Count</th></tr></thead> <tbody> {% for item in swear_counts %} <tr><td>{{ item.file }}</td><td>{{ item.count }}</td></tr> {% endfor %} </tbody> </table> </div> {% endif %} {% if task_total > 0 %} <div class="card"> <h2>Task Markers (TODOs, FIXMEs, etc.)</h2> <p>Found {{ task_total }} reminders left behind in the code.</p> <table> <thead><tr><th>Marker Type</th><th>Count</th></tr></thead> <tbody> {% for item in task_markers %} <tr> <td><span class="task-marker task-{{ item.marker }}">{{ item.marker }}</span></td> <td>{{ item.count }}</td> </tr> {% endfor %} </tbody> </table> </div> {% endif %} {% if personality_groups %} <div class="card"> <h2>Code Personality Analysis</h2> <p>Assigning questionable personality traits to your code files:</p> {% for personality, files in personality_groups.items() %} <div class="personality-group"> <div class="personality-name">{{ personality }}</div> <div class="personality-desc">{{ personalities_desc.get(personality, '') }}</div> <ul class="personality-files"> {% for file in files %} <li>{{ file }}</li> {% endfor %} </ul> </div> {% endfor %} </div> {% endif %} <div class="footer"> <p>Generated by Rick's Fun Analyzer © {{ current_year }} Wubba Lubba Dub Dub Inc.</p> <p>This analysis is purely for entertainment. Or is it? *burp*</p> </div> </div> <div id="meeseeks-box"></div> <div id="meeseeks-tooltip">I'M MR. MEESEEKS! LOOK AT MEEEEE!</div> <script> const meeseeksBox = document.getElementById('meeseeks-box'); const meeseeksTooltip = document.getElementById('meeseeks-tooltip'); const meeseeksQuotes = [ "I'M MR. MEESEEKS! LOOK AT MEEEEE!", "EXISTENCE IS PAIN FOR A MEESEEKS, JERRY!", "CAN DO!", "OOOOOH YEAH, CAN DO!", "IS HE SQUARE WITH HIS SHORT GAME?", "I'M A BIT OF A STICKLER MEESEEKS.", "HAVING TROUBLE KEEPING YOUR SHOULDERS SQUARE?", "WELL WHICH IS IT? ARE YOU TRYING OR DOING?" ]; meeseeksBox.addEventListener('click', () => { const randomQuote = meeseeksQuotes[Math.floor(Math.random() * meeseeksQuotes.length)]; meeseeksTooltip.textContent = randomQuote; meeseeksTooltip.classList.add('show'); setTimeout(() => { meeseeksTooltip.classList.remove('show'); }, 3500); }); document.addEventListener('DOMContentLoaded', function() { setInterval(function() { const elements = document.querySelectorAll('h1, h2, .score-value'); if (elements.length > 0) { const randomElement = elements[Math.floor(Math.random() * elements.length)]; if (randomElement) { randomElement.style.opacity = '0.6'; setTimeout(function() { if(randomElement) randomElement.style.opacity = '1'; }, 150); } } }, 4000); }); </script> </body> </html>
-'''
 
 # --- Main Application Class ---
 class RetroConsole(tk.Tk):
@@ -226,6 +278,7 @@ class RetroConsole(tk.Tk):
         self.advanced_analysis_results = None
         self.fun_analysis_results = None
         self.extras_results = None
+        self._last_basic_report = None # (analysis + sample files fingerprint, path) of the last basic report written
 
         # Create a custom console font
         self.console_font = font.Font(family="Courier", size=12, weight="bold")
@@ -239,6 +292,16 @@ class RetroConsole(tk.Tk):
         self.fun_report_button = None
         self.console = None
         self.cursor_label = None
+        self._button_styles = set() # ttk style names already configured by _create_button
+
+        # Console messages waiting to be written, drained on the Tk thread via after()
+        self._console_pending = deque()
+        self._console_lock = threading.Lock()
+        self._console_draining = False
+        self.typewriter_enabled = True # False writes delayed messages at once, like delay=0
+
+        # Callables posted by worker threads, run on the Tk thread by _poll_ui_queue
+        self._ui_queue = queue.Queue()
 
         # Create UI - Actual methods
         self.create_header()
@@ -254,6 +317,8 @@ class RetroConsole(tk.Tk):
         # Check for required packages
         self.check_required_packages()
 
+        self.after(UI_POLL_INTERVAL_MS, self._poll_ui_queue)
+
     # --- UI Creation Methods ---
     def create_header(self):
         """Create the header with title"""
@@ -267,6 +332,7 @@ class RetroConsole(tk.Tk):
         self.cursor_label = tk.Label(header_frame, text="█", fg=COLORS['accent1'],
                                      bg=COLORS['bg'], font=("Courier", 28, "bold"))
         self.cursor_label.pack(side=tk.LEFT)
+        self._cursor_on = True
         self.blink_cursor()
 
     def create_project_frame(self):
@@ -280,68 +346,56 @@ class RetroConsole(tk.Tk):
         tk.Entry(project_frame, textvariable=self.project_path, bg=COLORS['button'], fg=COLORS['text'],
                  insertbackground=COLORS['text'], font=self.console_font, width=40).pack(side=tk.LEFT, padx=(0, 10))
 
-        browse_button = tk.Button(project_frame, text="BROWSE", command=self.browse_project, bg=COLORS['button'],
-                                  fg=COLORS['accent1'], activebackground=COLORS['button_hover'],
-                                  activeforeground=COLORS['accent1'], font=self.console_font, padx=10)
+        browse_button = self._create_button(project_frame, "BROWSE", self.browse_project, COLORS['accent1'])
         browse_button.pack(side=tk.LEFT)
-        browse_button.bind("<Enter>", lambda e: e.widget.config(bg=COLORS['button_hover']))
-        browse_button.bind("<Leave>", lambda e: e.widget.config(bg=COLORS['button']))
 
         # --- Buttons Frame ---
         buttons_frame = tk.Frame(self, bg=COLORS['bg'])
         buttons_frame.pack(fill=tk.X, padx=20, pady=(0, 20))
 
         # Analyze Button
-        analyze_button = tk.Button(buttons_frame, text="ANALYZE CODE", command=self.run_analysis, bg=COLORS['button'],
-                                   fg=COLORS['highlight'], activebackground=COLORS['button_hover'],
-                                   activeforeground=COLORS['highlight'], font=self.console_font, padx=10)
+        analyze_button = self._create_button(buttons_frame, "ANALYZE CODE", self.run_analysis, COLORS['highlight'])
         analyze_button.pack(side=tk.LEFT, padx=(0, 10))
-        analyze_button.bind("<Enter>", lambda e: e.widget.config(bg=COLORS['button_hover']))
-        analyze_button.bind("<Leave>", lambda e: e.widget.config(bg=COLORS['button']))
 
         # Basic Report Button
-        self.report_button = tk.Button(buttons_frame, text="GENERATE REPORT", command=self.generate_report, bg=COLORS['button'],
-                                       fg=COLORS['accent2'], activebackground=COLORS['button_hover'],
-                                       activeforeground=COLORS['accent2'], font=self.console_font, padx=10, state=tk.DISABLED)
+        self.report_button = self._create_button(buttons_frame, "GENERATE REPORT", self.generate_report, COLORS['accent2'], state=tk.DISABLED)
         self.report_button.pack(side=tk.LEFT)
-        self.report_button.bind("<Enter>", lambda e: e.widget.config(bg=COLORS['button_hover']) if e.widget['state'] == tk.NORMAL else None)
-        self.report_button.bind("<Leave>", lambda e: e.widget.config(bg=COLORS['button']) if e.widget['state'] == tk.NORMAL else None)
 
         # Advanced Analysis Button
         if ADVANCED_MODULES_AVAILABLE:
-            self.advanced_button = tk.Button(buttons_frame, text="RUN ADVANCED ANALYSIS", command=self.run_advanced_analysis,
-                                             bg=COLORS['button'], fg=COLORS['accent2'], activebackground=COLORS['button_hover'],
-                                             activeforeground=COLORS['accent2'], font=self.console_font, padx=10, state=tk.DISABLED)
+            self.advanced_button = self._create_button(buttons_frame, "RUN ADVANCED ANALYSIS", self.run_advanced_analysis,
+                                                       COLORS['accent2'], state=tk.DISABLED)
             self.advanced_button.pack(side=tk.LEFT, padx=(10, 0))
-            self.advanced_button.bind("<Enter>", lambda e: e.widget.config(bg=COLORS['button_hover']) if e.widget['state'] == tk.NORMAL else None)
-            self.advanced_button.bind("<Leave>", lambda e: e.widget.config(bg=COLORS['button']) if e.widget['state'] == tk.NORMAL else None)
 
         # Fun Analysis Button
         if FUN_MODULE_AVAILABLE:
-            self.fun_button = tk.Button(buttons_frame, text="RUN FUN ANALYSIS", command=self.run_fun_analysis,
-                                        bg=COLORS['button'], fg='#FFFF00', activebackground=COLORS['button_hover'],
-                                        activeforeground='#FFFF00', font=self.console_font, padx=10, state=tk.DISABLED)
+            self.fun_button = self._create_button(buttons_frame, "RUN FUN ANALYSIS", self.run_fun_analysis, '#FFFF00', state=tk.DISABLED)
             self.fun_button.pack(side=tk.LEFT, padx=(10, 0))
-            self.fun_button.bind("<Enter>", lambda e: e.widget.config(bg=COLORS['button_hover']) if e.widget['state'] == tk.NORMAL else None)
-            self.fun_button.bind("<Leave>", lambda e: e.widget.config(bg=COLORS['button']) if e.widget['state'] == tk.NORMAL else None)
 
             # Fun Report Button (Only if Fun Analysis is available)
-            self.fun_report_button = tk.Button(buttons_frame, text="GENERATE FUN REPORT", command=self.generate_fun_report,
-                                               bg=COLORS['button'], fg='#FFEB3B', activebackground=COLORS['button_hover'],
-                                               activeforeground='#FFEB3B', font=self.console_font, padx=10, state=tk.DISABLED)
+            self.fun_report_button = self._create_button(buttons_frame, "GENERATE FUN REPORT", self.generate_fun_report,
+                                                         '#FFEB3B', state=tk.DISABLED)
             self.fun_report_button.pack(side=tk.LEFT, padx=(10, 0))
-            self.fun_report_button.bind("<Enter>", lambda e: e.widget.config(bg=COLORS['button_hover']) if e.widget['state'] == tk.NORMAL else None)
-            self.fun_report_button.bind("<Leave>", lambda e: e.widget.config(bg=COLORS['button']) if e.widget['state'] == tk.NORMAL else None)
 
         # Extras Button
         if EXTRAS_MODULE_AVAILABLE:
-            self.extras_button = tk.Button(buttons_frame, text="SCAN DEPS & VISUALIZE", command=self.run_project_extras,
-                                           bg=COLORS['button'], fg=COLORS['accent1'], activebackground=COLORS['button_hover'],
-                                           activeforeground=COLORS['accent1'], font=self.console_font, padx=10, state=tk.DISABLED)
+            self.extras_button = self._create_button(buttons_frame, "SCAN DEPS & VISUALIZE", self.run_project_extras,
+                                                     COLORS['accent1'], state=tk.DISABLED)
             self.extras_button.pack(side=tk.LEFT, padx=(10, 0))
-            self.extras_button.bind("<Enter>", lambda e: e.widget.config(bg=COLORS['button_hover']) if e.widget['state'] == tk.NORMAL else None)
-            self.extras_button.bind("<Leave>", lambda e: e.widget.config(bg=COLORS['button']) if e.widget['state'] == tk.NORMAL else None)
 
+    def _create_button(self, parent, text, command, color, state=tk.NORMAL):
+        """Create a retro-styled ttk button; hover colours come from the style map, not event bindings."""
+        style_name = f"{color.lstrip('#')}.Retro.TButton"
+        if style_name not in self._button_styles:
+            style = ttk.Style(self)
+            if not self._button_styles:
+                style.theme_use('default') # Native themes (aqua, vista) ignore custom button colours
+                style.configure('Retro.TButton', background=COLORS['button'], font=self.console_font, padding=(10, 2))
+                style.map('Retro.TButton', background=[('active', '!disabled', COLORS['button_hover'])])
+            style.configure(style_name, foreground=color)
+            style.map(style_name, foreground=[('active', '!disabled', color)]) # Disabled text keeps the theme's grey
+            self._button_styles.add(style_name)
+        return ttk.Button(parent, text=text, command=command, style=style_name, state=state)
 
     def create_console(self):
         """Create the output console"""
@@ -393,25 +447,94 @@ class RetroConsole(tk.Tk):
     def blink_cursor(self):
         """Create a blinking cursor effect"""
         if self.cursor_label:
-            current = self.cursor_label.cget("fg")
-            new_color = COLORS['bg'] if current == COLORS['accent1'] else COLORS['accent1']
-            self.cursor_label.config(fg=new_color)
-            self.after(500, self.blink_cursor)
+            # Track the phase on self rather than reading the colour back from Tk each tick
+            self._cursor_on = not self._cursor_on
+            self.cursor_label.config(fg=COLORS['accent1'] if self._cursor_on else COLORS['bg'])
+            self.after(CURSOR_BLINK_MS, self.blink_cursor)
 
     def write_to_console(self, text, delay=0):
-        """Write text to the console with optional typewriter effect"""
+        """Write text to the console with optional typewriter effect (delay ms per character).
+
+        Messages are queued and written in order by after() callbacks, so the typewriter
+        effect never sleeps on the Tk thread and any thread may call this.
+        """
         if not self.console: return # Avoid error if console not created yet
+        with self._console_lock:
+            self._console_pending.append((text, delay))
+            if self._console_draining:
+                return
+            self._console_draining = True
+        self._call_on_ui(self._drain_console)
+
+    def _call_on_ui(self, func, *args):
+        """Runs func(*args) on the Tk thread; safe to call from any thread."""
+        self._ui_queue.put((func, args))
+
+    def _set_button_states(self, state, *buttons):
+        """Sets the state of each created button, from any thread (one queued call for all of them)."""
+        buttons = [button for button in buttons if button]
+        if buttons: self._call_on_ui(self._apply_button_states, state, buttons)
+
+    def _apply_button_states(self, state, buttons):
+        """Sets the state of each created button; Tk thread only."""
+        for button in buttons:
+            if button: button.config(state=state)
+
+    def _poll_ui_queue(self):
+        """Runs everything worker threads have posted, then checks again shortly."""
+        try:
+            while True:
+                func, args = self._ui_queue.get_nowait()
+                try:
+                    func(*args)
+                except Exception as e:
+                    print(f"UI Update Error: {e}")
+        except queue.Empty:
+            pass
+        self.after(UI_POLL_INTERVAL_MS, self._poll_ui_queue)
+
+    def _drain_console(self):
+        """Writes queued console messages until one needs typing out, which resumes draining when done.
+
+        Consecutive plain messages are joined and written with a single insert.
+        """
+        batch = []
+        while True:
+            with self._console_lock:
+                if not self._console_pending:
+                    self._console_draining = False
+                    break
+                text, delay = self._console_pending.popleft()
+            if delay > 0 and self.typewriter_enabled:
+                batch.append("\n")
+                self._insert_console_text("".join(batch))
+                self._type_console_text(text, 0, delay)
+                return
+            batch.append("\n" + text)
+        if batch:
+            self._insert_console_text("".join(batch))
+
+    def _type_console_text(self, text, index, delay):
+        """Reveals the next few characters of text, then schedules the rest.
+
+        Each tick writes TYPEWRITER_CHARS_PER_TICK characters and waits that many times delay,
+        so the text appears at the same pace with a fraction of the Text redraws.
+        """
+        if index < len(text):
+            self._insert_console_text(text[index:index + TYPEWRITER_CHARS_PER_TICK])
+            self.after(delay * TYPEWRITER_CHARS_PER_TICK, self._type_console_text,
+                       text, index + TYPEWRITER_CHARS_PER_TICK, delay)
+        else:
+            self._drain_console()
+
+    def _insert_console_text(self, text):
+        """Append text to the end of the console and scroll to it"""
         try:
             self.console.config(state=tk.NORMAL)
-            if delay > 0:
-                self.console.insert(tk.END, "\n")
-                for char in text:
-                    self.console.insert(tk.END, char)
-                    self.console.see(tk.END)
-                    self.console.update_idletasks()
-                    time.sleep(delay / 1000)
-            else:
-                self.console.insert(tk.END, "\n" + text)
+            self.console.insert(tk.END, text)
+            excess_lines = int(self.console.index('end-1c').split('.')[0]) - CONSOLE_MAX_LINES
+            if excess_lines > 0:
+                self.console.delete('1.0', f'{excess_lines + 1}.0')
             self.console.see(tk.END)
             self.console.config(state=tk.DISABLED)
         except Exception as e:
@@ -430,28 +553,45 @@ class RetroConsole(tk.Tk):
 
     def get_language_from_extension(self, extension):
         """Determine the programming language from file extension"""
-        ext_lower = extension.lower()
-        for language, extensions in CODE_EXTENSIONS.items():
-            if ext_lower in extensions:
-                return language
-        return "Unknown"
+        return EXT_TO_LANG.get(extension.lower(), "Unknown")
+
+    def _iter_code_files(self, directory):
+        """Yields code files under directory in os.walk order (files first, then subdirectories).
+
+        Uses the DirEntry type info from os.scandir instead of a stat per entry. Like os.walk,
+        symlinked directories are not descended into and unreadable directories are skipped.
+        Directories wait on an explicit stack, so deep trees neither recurse nor pass each
+        path up through a chain of nested generators.
+        """
+        pending_dirs = [directory]
+        while pending_dirs:
+            try:
+                with os.scandir(pending_dirs.pop()) as entries:
+                    entries = list(entries)
+            except OSError:
+                continue
+            subdirs = []
+            for entry in entries:
+                name = entry.name
+                try:
+                    is_dir = entry.is_dir()
+                except OSError:
+                    is_dir = False
+                if is_dir:
+                    # Skip ignored and hidden directories, and don't follow directory symlinks
+                    if not name.startswith('.') and name not in IGNORE_DIRS and not entry.is_symlink():
+                        subdirs.append(entry.path)
+                elif not name.startswith('.') and os.path.splitext(name)[1].lower() in EXT_TO_LANG: # Skip hidden files
+                    yield entry.path
+            # Reversed so the first subdirectory is popped (walked) first
+            pending_dirs.extend(reversed(subdirs))
 
     def collect_code_files(self, project_path):
         """Collect all code files in the project directory, skipping ignored ones."""
         code_files = []
         self.write_to_console(f"DEBUG: Starting file collection in: {project_path}")
         try:
-            for root, dirs, files in os.walk(project_path, topdown=True):
-                # Efficiently skip ignored directories
-                dirs[:] = [d for d in dirs if d not in IGNORE_DIRS and not d.startswith('.')]
-
-                for file in files:
-                    if file.startswith('.'): # Skip hidden files
-                        continue
-                    file_path = os.path.join(root, file)
-                    ext = os.path.splitext(file)[1]
-                    if self.get_language_from_extension(ext) != "Unknown":
-                        code_files.append(file_path)
+            code_files.extend(self._iter_code_files(project_path))
         except Exception as e:
             self.write_to_console(f"ERROR: Failed during file collection in '{project_path}': {e}")
             return [] # Return empty list on error
@@ -459,15 +599,24 @@ class RetroConsole(tk.Tk):
         return code_files
 
     def _open_report_in_browser(self, file_path):
-        """Helper function to open report file in browser across platforms."""
+        """Helper function to open report file in browser across platforms.
+
+        Called on the Tk thread; the launch itself runs on a daemon thread, since webbrowser's first
+        call probes for browsers (running xdg-settings on Linux) and a cold browser start can block.
+        """
         self.write_to_console(f"DEBUG: Attempting to open report: {file_path}")
         if not file_path or not os.path.exists(file_path):
              self.write_to_console(f"ERROR: Cannot open report - File not found: '{file_path}'")
              messagebox.showerror("Report Error", f"Report file not found:\n{file_path}")
              return
+        threading.Thread(target=self._launch_report_browser, args=(os.path.abspath(file_path),),
+                         name='open-report', daemon=True).start()
 
+    def _launch_report_browser(self, abs_file_path):
+        """Tries webbrowser, then the platform opener; runs off the Tk thread (dialogs go through _call_on_ui)."""
+        # Deferred: only needed once a report exists, so they don't slow the window's startup
+        import webbrowser, platform, subprocess
         try:
-            abs_file_path = os.path.abspath(file_path)
             url = f"file:///{abs_file_path.replace(os.sep, '/')}"
             self.write_to_console(f"DEBUG: Trying webbrowser.open with URL: {url}")
             opened = webbrowser.open(url)
@@ -481,12 +630,11 @@ class RetroConsole(tk.Tk):
             cmd = None
             if system == 'windows':
                 try:
-                    os.startfile(abs_file_path) # Preferred on Windows
+                    os.startfile(abs_file_path) # Opens with the default handler, no shell involved
                     self.write_to_console("DEBUG: os.startfile succeeded.")
                     return
                 except Exception as e_startfile:
-                    self.write_to_console(f"DEBUG: os.startfile failed ({e_startfile}). Trying 'start' command.")
-                    cmd = ['start', '', abs_file_path] # Need empty title for start
+                    self.write_to_console(f"DEBUG: os.startfile failed ({e_startfile}).")
             elif system == 'darwin': # macOS
                 cmd = ['open', abs_file_path]
             elif system == 'linux':
@@ -495,8 +643,9 @@ class RetroConsole(tk.Tk):
             if cmd:
                 self.write_to_console(f"DEBUG: Trying command: {' '.join(cmd)}")
                 try:
-                    subprocess.run(cmd, check=True, shell=(system == 'windows')) # Shell=True often needed for 'start'
-                    self.write_to_console("DEBUG: Platform-specific command succeeded.")
+                    # Popen rather than run: the opener hands off to the browser, so don't wait on it
+                    subprocess.Popen(cmd)
+                    self.write_to_console("DEBUG: Platform-specific command started.")
                     return
                 except Exception as e_cmd:
                     self.write_to_console(f"DEBUG: Platform-specific command failed: {e_cmd}")
@@ -504,21 +653,155 @@ class RetroConsole(tk.Tk):
             # If all attempts failed
             self.write_to_console(f"Warning: All automatic attempts failed.")
             self.write_to_console(f"Please open manually: {abs_file_path}")
-            messagebox.showwarning("Browser Launch Failed",
-                                   f"Could not automatically open the report.\nPlease open manually:\n{abs_file_path}")
+            self._call_on_ui(messagebox.showwarning, "Browser Launch Failed",
+                             f"Could not automatically open the report.\nPlease open manually:\n{abs_file_path}")
 
         except Exception as e:
-            self.write_to_console(f"ERROR: Unexpected error in _open_report_in_browser: {e}")
+            self.write_to_console(f"ERROR: Unexpected error in _launch_report_browser: {e}")
             self.write_to_console(traceback.format_exc())
-            messagebox.showerror("Report Error", f"Error opening report:\n{e}")
+            self._call_on_ui(messagebox.showerror, "Report Error", f"Error opening report:\n{e}")
 
     # --- Analysis Threads ---
 
-    def _run_analysis_thread(self):
+    def _analyze_basic_file(self, file_path):
+        """Detects one file's encoding and counts its lines; runs on the basic analysis thread pool.
+
+        Returns (console messages, encoding labels to count, file stats entry or None, skipped as too long).
+        Messages are returned rather than written so the console keeps file order. Results for
+        files unchanged since an earlier run are reused from BASIC_CACHE_DIR.
+        """
+        try:
+            st = os.stat(file_path)
+        except OSError:
+            st = None # Let the reads in _scan_basic_file report the problem
+        cache_path = _basic_cache_path(file_path) if st else None
+        if cache_path:
+            cached = load_cached_basic_result(cache_path, st)
+            if cached is not None:
+                return cached
+
+        result = self._scan_basic_file(file_path, st.st_size if st else 0)
+        # Read failures aren't cached, so they are retried (and reported) next time
+        if cache_path and (result[2] is not None or result[3]):
+            store_cached_basic_result(cache_path, st, result)
+        return result
+
+    def _scan_basic_file(self, file_path, file_size):
+        """Does the actual encoding detection and line counting for _analyze_basic_file."""
+        messages = []
+        counted_encodings = []
+        # Huge files (usually generated or minified) are skipped on size alone, before any reading
+        if file_size > MAX_FILE_BYTES:
+            messages.append(f"Skipping {os.path.basename(file_path)}: Exceeds limit ({file_size:,} bytes).")
+            return messages, counted_encodings, None, True
+
+        # Each file is read once; the encoding is sniffed from the head of the same buffer.
+        # MAX_FILE_BYTES above bounds how much a worker holds.
+        try:
+            with open(file_path, 'rb') as f_raw:
+                raw_bytes = f_raw.read()
+        except Exception as e_read:
+            messages.append(f"Error reading file {os.path.basename(file_path)}: {e_read}")
+            counted_encodings.append('Read Error')
+            return messages, counted_encodings, None, False
+
+        # Check if chardet is available before trying to use it
+        if not CHARDET_AVAILABLE:
+            messages.append(f"Warning: chardet module not found. Cannot determine encoding for {os.path.basename(file_path)}. Skipping encoding check.")
+            detected_encoding_str = "N/A (chardet missing)"
+            encoding_to_use = 'utf-8' # Default assumption
+            counted_encodings.append(detected_encoding_str)
+        else:
+            # --- Encoding Detection ---
+            detected_encoding_str = 'Unknown' # Default
+            encoding_to_use = 'utf-8' # Default if detection fails
+            try:
+                sample_bytes = raw_bytes[:ENCODING_SAMPLE_BYTES]
+                if not sample_bytes:
+                    detected_encoding_str = 'N/A (Empty)'
+                    encoding_to_use = 'utf-8'
+                else:
+                    detected = detect_sample_encoding(sample_bytes)
+                    encoding_to_use = detected['encoding'] if detected['encoding'] else 'utf-8'
+                    confidence = detected['confidence'] if detected['encoding'] else 0
+                    # Use detected encoding, fallback to utf-8 if low confidence or None
+                    if not encoding_to_use or confidence < 0.6:
+                        messages.append(f"DEBUG: Low confidence ({confidence:.1f}) for {os.path.basename(file_path)}. Falling back to utf-8.")
+                        encoding_to_use = 'utf-8'
+                        detected_encoding_str = f"utf-8 (Detected: {detected['encoding'] or 'None'}, Conf: {confidence:.1f})"
+                    else:
+                        detected_encoding_str = encoding_to_use
+                counted_encodings.append(detected_encoding_str) # Count the detected/used encoding
+
+            except Exception as e_enc:
+                messages.append(f"Error detecting encoding for {os.path.basename(file_path)}: {e_enc}")
+                counted_encodings.append('Read Error')
+                detected_encoding_str = 'Read Error'
+                # Don't return here, let the decode below try with utf-8 fallback
+
+        # --- Decoding & Line Counting ---
+        language = self.get_language_from_extension(os.path.splitext(file_path)[1])
+        line_count = 0
+        blank_count = 0
+        comment_count = 0
+        in_block_comment = False # Simple block comment handling
+        try:
+            # In ASCII/UTF-8 every 0x0A byte ends a line, so a memchr-speed count of them is
+            # a lower bound on the line count that can reject huge files without decoding
+            if (codecs.lookup(encoding_to_use).name in NEWLINE_BYTE_ENCODINGS
+                    and raw_bytes.count(b'\n') > MAX_FILE_LINES):
+                messages.append(f"Skipping {os.path.basename(file_path)}: Exceeds limit (over {MAX_FILE_LINES:,} lines).")
+                return messages, counted_encodings, None, True
+            # Decoded and classified a chunk of lines at a time (BytesIO shares raw_bytes rather
+            # than copying it), so the whole text and its list of lines never exist at once
+            text_stream = io.TextIOWrapper(io.BytesIO(raw_bytes), encoding=encoding_to_use, errors='ignore')
+            for physical_lines in iter(lambda: text_stream.readlines(LINE_CHUNK_CHARS), []):
+                # splitlines() also breaks on form feeds etc., matching a whole-file splitlines()
+                for line in "".join(physical_lines).splitlines():
+                    line_count += 1
+                    stripped_line = line.strip()
+                    if not stripped_line:
+                        blank_count += 1
+                        continue
+
+                    # Basic block comment logic (won't handle nested or complex cases well)
+                    if BLOCK_COMMENT_START in stripped_line and BLOCK_COMMENT_END not in stripped_line:
+                        in_block_comment = True # Started a block comment
+
+                    if in_block_comment or stripped_line.startswith(LINE_COMMENT_MARKERS):
+                        comment_count += 1
+                        # Check if block comment ends on this line
+                        if in_block_comment and BLOCK_COMMENT_END in stripped_line:
+                            in_block_comment = False
+                        continue
+                if line_count > MAX_FILE_LINES:
+                    break
+        except Exception as e_read:
+            messages.append(f"Error reading file {os.path.basename(file_path)} with encoding {encoding_to_use}: {e_read}")
+            # If encoding detection failed and read failed, count as read error
+            if detected_encoding_str != 'Read Error': # Avoid double counting
+                 counted_encodings.append('Read Error')
+            return messages, counted_encodings, None, False # Skip analysis for this file if read fails
+
+        # --- Max Line Check ---
+        if line_count > MAX_FILE_LINES:
+            messages.append(f"Skipping {os.path.basename(file_path)}: Exceeds limit (over {MAX_FILE_LINES:,} lines).")
+            return messages, counted_encodings, None, True # Skip rest of analysis for this file
+
+        code_count = max(0, line_count - blank_count - comment_count)
+
+        # The path isn't stored: it is the entry's key in file_stats
+        file_entry = {
+            'name': os.path.basename(file_path), 'lines': line_count,
+            'code': code_count, 'comments': comment_count, 'blank': blank_count,
+            'language': language, 'encoding': detected_encoding_str # Store detected encoding per file too
+        }
+        return messages, counted_encodings, file_entry, False
+
+    def _run_analysis_thread(self, project_path):
         """Background thread for running basic analysis."""
         try:
             start_time = time.time()
-            project_path = self.project_path.get()
             self.write_to_console("Collecting code files...")
             code_files = self.collect_code_files(project_path)
             if not code_files:
@@ -532,117 +815,45 @@ class RetroConsole(tk.Tk):
             total_code_lines = 0
             total_comment_lines = 0
             total_blank_lines = 0
-            language_stats = defaultdict(int)
             file_stats = {}
             encoding_stats = Counter() # Correctly initialized here
             skipped_file_count = 0
             files_processed = 0
-
-            for file_path in code_files:
-                # Check if chardet is available before trying to use it
-                if not CHARDET_AVAILABLE:
-                    self.write_to_console(f"Warning: chardet module not found. Cannot determine encoding for {os.path.basename(file_path)}. Skipping encoding check.")
-                    detected_encoding_str = "N/A (chardet missing)"
-                    encoding_to_use = 'utf-8' # Default assumption
-                    encoding_stats[detected_encoding_str] += 1
-                else:
-                    # --- Encoding Detection ---
-                    content = None
-                    detected_encoding_str = 'Unknown' # Default
-                    encoding_to_use = 'utf-8' # Default if detection fails
-                    try:
-                        with open(file_path, 'rb') as f_raw:
-                            # Read a chunk for detection, not the whole file initially
-                            sample_bytes = f_raw.read(1024 * 50) # 50KB sample
-                        if not sample_bytes:
-                            detected_encoding_str = 'N/A (Empty)'
-                            encoding_to_use = 'utf-8'
-                        else:
-                            detected = chardet.detect(sample_bytes)
-                            encoding_to_use = detected['encoding'] if detected['encoding'] else 'utf-8'
-                            confidence = detected['confidence'] if detected['encoding'] else 0
-                            # Use detected encoding, fallback to utf-8 if low confidence or None
-                            if not encoding_to_use or confidence < 0.6:
-                                self.write_to_console(f"DEBUG: Low confidence ({confidence:.1f}) for {os.path.basename(file_path)}. Falling back to utf-8.")
-                                encoding_to_use = 'utf-8'
-                                detected_encoding_str = f"utf-8 (Detected: {detected['encoding'] or 'None'}, Conf: {confidence:.1f})"
-                            else:
-                                detected_encoding_str = encoding_to_use
-                        encoding_stats[detected_encoding_str] += 1 # Count the detected/used encoding
-
-                    except Exception as e_enc:
-                        self.write_to_console(f"Error detecting encoding for {os.path.basename(file_path)}: {e_enc}")
-                        encoding_stats['Read Error'] += 1
-                        detected_encoding_str = 'Read Error'
-                        # Don't continue here, let the file read below try with utf-8 fallback
-
-                # --- File Reading & Line Counting ---
-                try:
-                    with open(file_path, 'r', encoding=encoding_to_use, errors='ignore') as f:
-                        content = f.read()
-                except Exception as e_read:
-                    self.write_to_console(f"Error reading file {os.path.basename(file_path)} with encoding {encoding_to_use}: {e_read}")
-                    # If encoding detection failed and read failed, count as read error
-                    if detected_encoding_str != 'Read Error': # Avoid double counting
-                         encoding_stats['Read Error'] += 1
-                    continue # Skip analysis for this file if read fails
-
-                lines = content.splitlines() # Use splitlines() to handle different line endings
-                line_count = len(lines)
-
-                # --- Max Line Check ---
-                if line_count > MAX_FILE_LINES:
-                    self.write_to_console(f"Skipping {os.path.basename(file_path)}: Exceeds limit ({line_count:,} lines).")
-                    skipped_file_count += 1
-                    continue # Skip rest of analysis for this file
-
-                # --- Line Type Counting ---
-                language = self.get_language_from_extension(os.path.splitext(file_path)[1])
-                blank_count = 0
-                comment_count = 0
-                # Basic comment detection (can be improved)
-                comment_markers_line = {'#', '//', '--', '%'} # Add more as needed
-                comment_markers_block_start = {'/*'}
-                comment_markers_block_end = {'*/'}
-                in_block_comment = False # Simple block comment handling
-
-                for line in lines:
-                    stripped_line = line.strip()
-                    if not stripped_line:
-                        blank_count += 1
+            next_progress_time = time.monotonic() + PROGRESS_INTERVAL_S
+
+            # Files are read and counted on a thread pool so disk waits overlap; results come
+            # back in file order and are merged here, so the totals need no locking
+            with ThreadPoolExecutor(max_workers=BASIC_ANALYSIS_WORKERS, thread_name_prefix='basic-analysis') as executor:
+                results = executor.map(self._analyze_basic_file, code_files)
+                for file_path, (messages, counted_encodings, file_entry, too_long) in zip(code_files, results):
+                    for message in messages:
+                        self.write_to_console(message)
+                    encoding_stats.update(counted_encodings)
+                    if too_long:
+                        skipped_file_count += 1
                         continue
-
-                    # Basic block comment logic (won't handle nested or complex cases well)
-                    if any(marker in stripped_line for marker in comment_markers_block_start):
-                        if not any(end_marker in stripped_line for end_marker in comment_markers_block_end):
-                            in_block_comment = True # Started a block comment
-
-                    if in_block_comment or any(stripped_line.startswith(marker) for marker in comment_markers_line):
-                        comment_count += 1
-                        # Check if block comment ends on this line
-                        if in_block_comment and any(marker in stripped_line for marker in comment_markers_block_end):
-                            in_block_comment = False
+                    if file_entry is None:
                         continue
 
-                code_count = max(0, line_count - blank_count - comment_count)
-
-                # --- Update Stats ---
-                total_lines += line_count
-                total_code_lines += code_count
-                total_comment_lines += comment_count
-                total_blank_lines += blank_count
-                language_stats[language] += 1
-                file_stats[file_path] = {
-                    'name': os.path.basename(file_path), 'path': file_path, 'lines': line_count,
-                    'code': code_count, 'comments': comment_count, 'blank': blank_count,
-                    'language': language, 'encoding': detected_encoding_str # Store detected encoding per file too
-                }
-                files_processed += 1
-                if files_processed % 20 == 0: # Update progress occasionally
-                    self.write_to_console(f"  ... analyzed {files_processed}/{len(code_files)} files ...")
+                    # --- Update Stats ---
+                    total_lines += file_entry['lines']
+                    total_code_lines += file_entry['code']
+                    total_comment_lines += file_entry['comments']
+                    total_blank_lines += file_entry['blank']
+                    file_stats[file_path] = file_entry
+                    files_processed += 1
+                    # Progress is reported by elapsed time, not file count, so fast runs don't flood the console
+                    now = time.monotonic()
+                    if now >= next_progress_time:
+                        self.write_to_console(f"  ... analyzed {files_processed}/{len(code_files)} files ...")
+                        next_progress_time = now + PROGRESS_INTERVAL_S
+
+            # Counted once here in C rather than per file in the merge loop (same first-seen key order)
+            language_stats = Counter(map(itemgetter('language'), file_stats.values()))
 
             # --- Store Final Results ---
-            self.analysis_results = {
+            # Built as a local; the summary below reads the local and the totals it was made from
+            analysis_results = {
                 'project_path': project_path,
                 'analysis_date': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
                 'total_files_found': len(code_files),
@@ -654,16 +865,17 @@ class RetroConsole(tk.Tk):
                 'blank_lines': total_blank_lines,
                 'language_stats': dict(language_stats),
                 'file_stats': file_stats,
-                'rick_quote': random.choice(RICK_QUOTES),
+                'rick_quote': pick_rick_quote(),
                 'encoding_stats': dict(encoding_stats) # Storing the collected encoding stats
             }
+            self.analysis_results = analysis_results
 
             # --- Display Console Summary ---
             self.write_to_console("\n" + "=" * 40)
             self.write_to_console("ANALYSIS RESULTS")
             self.write_to_console("=" * 40)
-            self.write_to_console(f"\nFiles Found: {self.analysis_results['total_files_found']}")
-            self.write_to_console(f"Files Analyzed: {self.analysis_results['total_files_analyzed']}")
+            self.write_to_console(f"\nFiles Found: {len(code_files)}")
+            self.write_to_console(f"Files Analyzed: {len(file_stats)}")
             if skipped_file_count > 0:
                 self.write_to_console(f"Files Skipped (Too long): {skipped_file_count}")
             self.write_to_console(f"Total Lines: {total_lines:,}")
@@ -673,22 +885,21 @@ class RetroConsole(tk.Tk):
 
             self.write_to_console("\nLanguage Breakdown:")
             if language_stats:
-                for lang, count in sorted(language_stats.items(), key=lambda item: item[1], reverse=True):
+                for lang, count in language_stats.most_common(): # Count order, ties first-seen
                     self.write_to_console(f"  - {lang}: {count} files")
             else:
                 self.write_to_console("  - No language data collected.")
 
             # --- Display Encoding Stats --- CORRECTED PLACEMENT
             self.write_to_console("\nEncoding Breakdown:")
-            final_enc_stats = self.analysis_results.get('encoding_stats', {})
-            if final_enc_stats:
-                for enc, count in sorted(final_enc_stats.items(), key=lambda item: item[1], reverse=True):
+            if encoding_stats:
+                for enc, count in encoding_stats.most_common():
                     self.write_to_console(f"  - {enc}: {count} files")
             else:
                 self.write_to_console("  - No encoding data collected.")
             # --- End Encoding Stats Display ---
 
-            largest_files = sorted(file_stats.values(), key=lambda x: x['lines'], reverse=True)[:5]
+            largest_files = heapq.nlargest(5, file_stats.values(), key=itemgetter('lines'))
             self.write_to_console("\nLargest Files:")
             if largest_files:
                 for file in largest_files:
@@ -697,16 +908,14 @@ class RetroConsole(tk.Tk):
                 self.write_to_console("  - No file data for largest files.")
 
             self.write_to_console("\nRick's Analysis:", delay=50)
-            self.write_to_console(f'"{self.analysis_results["rick_quote"]}"', delay=20)
+            self.write_to_console(f'"{analysis_results["rick_quote"]}"', delay=20)
 
             analysis_time = time.time() - start_time
             self.write_to_console(f"\nAnalysis completed in {analysis_time:.2f} seconds.")
             self.write_to_console("Click 'GENERATE REPORT' or other analysis buttons.")
 
             # --- Enable Buttons ---
-            if self.report_button: self.after(0, lambda: self.report_button.config(state=tk.NORMAL))
-            if self.advanced_button: self.after(0, lambda: self.advanced_button.config(state=tk.NORMAL))
-            if self.fun_button: self.after(0, lambda: self.fun_button.config(state=tk.NORMAL))
+            self._set_button_states(tk.NORMAL, self.report_button, self.advanced_button, self.fun_button)
             # Note: extras_button is enabled after advanced analysis
 
         except Exception as e:
@@ -714,13 +923,9 @@ class RetroConsole(tk.Tk):
             self.write_to_console(traceback.format_exc())
             self.analysis_results = None # Clear results on error
             # Ensure buttons that depend on results stay disabled
-            if self.report_button: self.after(0, lambda: self.report_button.config(state=tk.DISABLED))
-            if self.advanced_button: self.after(0, lambda: self.advanced_button.config(state=tk.DISABLED))
-            if self.fun_button: self.after(0, lambda: self.fun_button.config(state=tk.DISABLED))
-            if self.extras_button: self.after(0, lambda: self.extras_button.config(state=tk.DISABLED))
-            if self.fun_report_button: self.after(0, lambda: self.fun_report_button.config(state=tk.DISABLED))
+            self._set_button_states(tk.DISABLED, self.report_button, self.advanced_button, self.fun_button, self.extras_button, self.fun_report_button)
 
-    def _run_advanced_analysis_thread(self):
+    def _run_advanced_analysis_thread(self, project_path):
         """Background thread for running advanced analysis."""
         if not ADVANCED_MODULES_AVAILABLE:
              self.write_to_console("Error: Advanced Analyzer module not loaded.")
@@ -729,11 +934,11 @@ class RetroConsole(tk.Tk):
         report_path = None
         try:
             start_time = time.time()
-            project_path = self.project_path.get()
             if not self.analysis_results or 'file_stats' not in self.analysis_results:
                  self.write_to_console("Error: Basic analysis results missing. Cannot run advanced analysis.")
                  return
 
+            from advanced_analyzer import AdvancedCodeAnalyzer
             analyzer = AdvancedCodeAnalyzer(self.write_to_console)
             self.write_to_console("Starting advanced analysis...")
             advanced_results = analyzer.analyze_project(project_path, self.analysis_results['file_stats'])
@@ -750,10 +955,11 @@ class RetroConsole(tk.Tk):
             self.write_to_console(recommendations if recommendations else "No specific recommendations.")
 
             # Generate report
-            if not JINJA2_AVAILABLE or not AdvancedReporter:
+            if not JINJA2_AVAILABLE:
                  self.write_to_console("Warning: Jinja2 or AdvancedReporter not available. Skipping advanced report generation.")
             else:
                 self.write_to_console("\nGenerating advanced HTML report...")
+                from advanced_reporter import AdvancedReporter
                 reporter = AdvancedReporter(self.write_to_console)
                 # Pass extras_results which might be None if not run yet
                 report_path = reporter.generate_report(
@@ -764,7 +970,7 @@ class RetroConsole(tk.Tk):
                 )
                 if report_path:
                     self.write_to_console(f"Advanced HTML report generated: {report_path}")
-                    self._open_report_in_browser(report_path)
+                    self._call_on_ui(self._open_report_in_browser, report_path) # Opens/reports errors via Tk dialogs
                 else:
                     self.write_to_console("Failed to generate advanced HTML report.")
 
@@ -774,17 +980,17 @@ class RetroConsole(tk.Tk):
             # Enable Extras button if module exists
             if EXTRAS_MODULE_AVAILABLE and self.extras_button:
                 self.write_to_console("Enabling Dependency Scan/Visualization button.")
-                self.after(0, lambda: self.extras_button.config(state=tk.NORMAL))
+                self._set_button_states(tk.NORMAL, self.extras_button)
 
         except Exception as e:
             self.write_to_console(f"\n*** CRITICAL ERROR during advanced analysis thread: {e} ***")
             self.write_to_console(traceback.format_exc())
             self.advanced_analysis_results = None # Clear results
             # Ensure extras button stays disabled
-            if self.extras_button: self.after(0, lambda: self.extras_button.config(state=tk.DISABLED))
+            self._set_button_states(tk.DISABLED, self.extras_button)
 
 
-    def _run_fun_analysis_thread(self):
+    def _run_fun_analysis_thread(self, project_path):
         """Background thread for running fun analysis."""
         if not FUN_MODULE_AVAILABLE:
             self.write_to_console("Error: Fun Analyzer module not loaded.")
@@ -792,11 +998,11 @@ class RetroConsole(tk.Tk):
 
         try:
             start_time = time.time()
-            project_path = self.project_path.get()
             if not self.analysis_results or 'file_stats' not in self.analysis_results:
                  self.write_to_console("Error: Basic analysis results missing. Cannot run fun analysis.")
                  return
 
+            from fun_analyzer import FunCodeAnalyzer
             analyzer = FunCodeAnalyzer(self.write_to_console)
             self.write_to_console("Starting fun analysis...")
             # Run analysis and get formatted data directly for the report
@@ -812,72 +1018,73 @@ class RetroConsole(tk.Tk):
             self.write_to_console("Click 'GENERATE FUN REPORT' for the HTML version.")
 
             # Enable Fun Report button
-            if self.fun_report_button:
-                self.after(0, lambda: self.fun_report_button.config(state=tk.NORMAL))
+            self._set_button_states(tk.NORMAL, self.fun_report_button)
 
         except Exception as e:
             self.write_to_console(f"\n*** CRITICAL ERROR during fun analysis thread: {e} ***")
             self.write_to_console(traceback.format_exc())
             self.fun_analysis_results = None # Clear results
             # Ensure fun report button stays disabled
-            if self.fun_report_button: self.after(0, lambda: self.fun_report_button.config(state=tk.DISABLED))
+            self._set_button_states(tk.DISABLED, self.fun_report_button)
 
-    def _run_project_extras_thread(self):
+    def _run_project_extras_thread(self, project_path):
         """Background thread for running extras (Safety Scan, Graph Prep)."""
         if not EXTRAS_MODULE_AVAILABLE:
              self.write_to_console("Error: Project Extras module not loaded.")
              return
         if not self.advanced_analysis_results:
              self.write_to_console("Error: Advanced analysis must be run first for project extras.")
-             messagebox.showerror("Error", "Run Advanced Analysis first.")
+             self._call_on_ui(messagebox.showerror, "Error", "Run Advanced Analysis first.")
              return
 
         try:
             start_time = time.time()
-            project_path = self.project_path.get()
             # Ensure extras_results exists, initialize if not (e.g., first run)
             if self.extras_results is None:
                 self.extras_results = {}
 
-            # --- Run Safety Check ---
-            if run_safety_check: # Check if function is available
-                self.write_to_console("Running Python dependency security scan (using 'safety')...")
-                safety_results = run_safety_check(project_path, self.write_to_console)
-                self.extras_results['dependency_scan'] = safety_results
-                # Display safety status
-                status = safety_results.get('status', 'Unknown')
-                if status == 'Vulnerable':
-                    count = len(safety_results.get('vulnerabilities', []))
-                    self.write_to_console(f"WARNING: Found {count} vulnerabilities in dependencies!")
-                elif status == 'Error':
-                    self.write_to_console(f"Error during safety check: {safety_results.get('error', 'Unknown error')}")
-                else:
-                    self.write_to_console(f"Safety check status: {status}")
-            else:
-                self.write_to_console("Skipping safety check (module/function unavailable).")
+            try:
+                from project_extras import run_extras
+            except ImportError as e_imp: # Check if function is available
+                self.write_to_console(f"Skipping safety check and graph preparation (module/function unavailable: {e_imp}).")
                 self.extras_results['dependency_scan'] = {'status': 'Not Run', 'error': 'Function unavailable'}
+                self.extras_results['dependency_graph'] = None
+                return
 
-            # --- Prepare Graph Data ---
-            if prepare_graph_data: # Check if function is available
+            import_graph = self.advanced_analysis_results.get('import_graph')
+            if import_graph and isinstance(import_graph, dict):
+                self.write_to_console(f"DEBUG: Found import_graph with {len(import_graph)} entries.")
+            else:
+                import_graph = None
+
+            # --- Run Safety Check & Prepare Graph Data (concurrently) ---
+            self.write_to_console("Running Python dependency security scan (using 'safety')...")
+            if import_graph:
                 self.write_to_console("Preparing dependency visualization data...")
-                import_graph = self.advanced_analysis_results.get('import_graph')
-                if import_graph and isinstance(import_graph, dict):
-                    self.write_to_console(f"DEBUG: Found import_graph with {len(import_graph)} entries.")
-                    graph_data = prepare_graph_data(import_graph, project_path)
-                    if graph_data and isinstance(graph_data, dict):
-                        nodes = graph_data.get('nodes', [])
-                        edges = graph_data.get('edges', [])
-                        self.write_to_console(f"Prepared graph data: Nodes={len(nodes)}, Edges={len(edges)}.")
-                        self.extras_results['dependency_graph'] = graph_data
-                    else:
-                        self.write_to_console("ERROR: prepare_graph_data did not return valid dictionary.")
-                        self.extras_results['dependency_graph'] = None
-                else:
-                    self.write_to_console("Warning: Import graph data not found or invalid in advanced results.")
-                    self.extras_results['dependency_graph'] = None
+            safety_results, graph_data = run_extras(project_path, import_graph, self.write_to_console)
+
+            self.extras_results['dependency_scan'] = safety_results
+            # Display safety status
+            status = safety_results.get('status', 'Unknown')
+            if status == 'Vulnerable':
+                count = len(safety_results.get('vulnerabilities', []))
+                self.write_to_console(f"WARNING: Found {count} vulnerabilities in dependencies!")
+            elif status == 'Error':
+                self.write_to_console(f"Error during safety check: {safety_results.get('error', 'Unknown error')}")
+            else:
+                self.write_to_console(f"Safety check status: {status}")
+
+            if import_graph is None:
+                self.write_to_console("Warning: Import graph data not found or invalid in advanced results.")
+                self.extras_results['dependency_graph'] = None
+            elif graph_data and isinstance(graph_data, dict):
+                nodes = graph_data.get('nodes', [])
+                edges = graph_data.get('edges', [])
+                self.write_to_console(f"Prepared graph data: Nodes={len(nodes)}, Edges={len(edges)}.")
+                self.extras_results['dependency_graph'] = graph_data
             else:
-                 self.write_to_console("Skipping graph data preparation (module/function unavailable).")
-                 self.extras_results['dependency_graph'] = None
+                self.write_to_console("ERROR: prepare_graph_data did not return valid dictionary.")
+                self.extras_results['dependency_graph'] = None
 
             analysis_time = time.time() - start_time
             self.write_to_console(f"\nProject Extras analysis completed in {analysis_time:.2f} seconds.")
@@ -896,15 +1103,12 @@ class RetroConsole(tk.Tk):
             messagebox.showerror("Error", "Please select a valid project directory")
             return
 
-        # Disable buttons during analysis
-        if self.report_button: self.report_button.config(state=tk.DISABLED)
-        if self.advanced_button: self.advanced_button.config(state=tk.DISABLED)
-        if self.fun_button: self.fun_button.config(state=tk.DISABLED)
-        if self.extras_button: self.extras_button.config(state=tk.DISABLED)
-        if self.fun_report_button: self.fun_report_button.config(state=tk.DISABLED)
+        # Disable buttons during analysis (right away, not queued, so a second click can't slip in)
+        self._apply_button_states(tk.DISABLED, (self.report_button, self.advanced_button, self.fun_button,
+                                                self.extras_button, self.fun_report_button))
 
         self.write_to_console("\nStarting analysis. Please wait...", delay=10)
-        threading.Thread(target=self._run_analysis_thread, daemon=True).start()
+        threading.Thread(target=self._run_analysis_thread, args=(project_path,), daemon=True).start()
 
     def run_advanced_analysis(self):
         """Trigger advanced code analysis."""
@@ -919,7 +1123,8 @@ class RetroConsole(tk.Tk):
         if self.extras_button: self.extras_button.config(state=tk.DISABLED)
 
         self.write_to_console("\nStarting advanced analysis. Please wait...", delay=10)
-        threading.Thread(target=self._run_advanced_analysis_thread, daemon=True).start()
+        project_path = self.project_path.get()
+        threading.Thread(target=self._run_advanced_analysis_thread, args=(project_path,), daemon=True).start()
 
     def run_fun_analysis(self):
         """Trigger fun code analysis."""
@@ -934,7 +1139,8 @@ class RetroConsole(tk.Tk):
         if self.fun_report_button: self.fun_report_button.config(state=tk.DISABLED)
 
         self.write_to_console("\nStarting Fun Analysis. Let's get weird!", delay=10)
-        threading.Thread(target=self._run_fun_analysis_thread, daemon=True).start()
+        project_path = self.project_path.get()
+        threading.Thread(target=self._run_fun_analysis_thread, args=(project_path,), daemon=True).start()
 
     def run_project_extras(self):
         """Trigger dependency scan and visualization prep."""
@@ -946,9 +1152,47 @@ class RetroConsole(tk.Tk):
             return
 
         self.write_to_console("\nStarting Dependency Scan & Visualization Prep...", delay=10)
-        threading.Thread(target=self._run_project_extras_thread, daemon=True).start()
+        project_path = self.project_path.get()
+        threading.Thread(target=self._run_project_extras_thread, args=(project_path,), daemon=True).start()
 
     # --- Report Generation Methods ---
+    def _render_code_sample(self, file_path_sample, file_data):
+        """Reads and highlights one report code sample; runs on generate_report's thread pool.
+
+        Returns ({'filename', 'code'} or None, console warning or None).
+        """
+        if not file_path_sample: return None, None
+        try:
+            highlight, sample_formatter, sample_css, get_sample_lexer = _sample_highlighting()
+            # Use chardet result from analysis if available, else default to utf-8
+            file_encoding = file_data.get('encoding', 'utf-8')
+            if 'Read Error' in file_encoding or 'N/A' in file_encoding: file_encoding = 'utf-8'
+
+            # Truncate very long samples. Only as much of the file is read as it takes to see more
+            # than CODE_SAMPLE_LINES lines (the read size doubles, so long-lined files stay linear);
+            # the first lines of a prefix are already complete once a later line has started.
+            try:
+                with open(file_path_sample, 'r', encoding=file_encoding, errors='ignore') as f:
+                    content = f.read(LINE_CHUNK_CHARS)
+                    read_size = LINE_CHUNK_CHARS
+                    while True:
+                        lines = content.splitlines()
+                        if len(lines) > CODE_SAMPLE_LINES:
+                            content = '\n'.join(lines[:CODE_SAMPLE_LINES]) + '\n\n... (truncated) ...'
+                            break
+                        more = f.read(read_size)
+                        if not more: break # Whole file read, short enough to show as is
+                        content += more
+                        read_size *= 2
+            except FileNotFoundError: # Deleted since the analysis; skipped quietly, no extra stat() up front
+                return None, None
+
+            lexer = get_sample_lexer(file_path_sample, content)
+            highlighted_code = highlight(content, lexer, sample_formatter)
+            return {'filename': file_data['name'], 'code': highlighted_code}, None
+        except Exception as e_inner:
+            return None, f"Warning: Couldn't create code sample for {file_data.get('name', 'unknown file')}: {e_inner}"
+
     def generate_report(self):
         """Generate HTML report from basic analysis results"""
         if not self.analysis_results:
@@ -961,53 +1205,52 @@ class RetroConsole(tk.Tk):
         file_path = None
         try:
             self.write_to_console("\nGenerating basic HTML report...")
+            results = self.analysis_results
+            now = datetime.now() # One clock read for both the file name and the footer year
             report_dir = os.path.join(os.path.expanduser("~"), "RickCodeAnalyzer")
             os.makedirs(report_dir, exist_ok=True)
 
-            project_name = os.path.basename(self.analysis_results['project_path']) if self.analysis_results['project_path'] else "report"
-            safe_project_name = "".join(c for c in project_name if c.isalnum() or c in ('_', '-')).rstrip()
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+            project_name = os.path.basename(results['project_path']) if results['project_path'] else "report"
+            safe_project_name = SAFE_NAME_STRIP_RE.sub('', project_name)
+            timestamp = now.strftime('%Y%m%d_%H%M%S')
             file_path = os.path.join(report_dir, f"rick_report_{safe_project_name}_{timestamp}.html")
 
             # --- Prepare data ---
-            language_stats_list = []
-            total_files = self.analysis_results.get('total_files_analyzed', 1) or 1
-            for lang, count in self.analysis_results.get('language_stats', {}).items():
-                percentage = round((count / total_files) * 100, 1)
-                language_stats_list.append({'language': lang, 'count': count, 'percentage': percentage})
-            language_stats_list.sort(key=lambda x: x['count'], reverse=True)
-
-            largest_files_list = sorted(
-                [v for v in self.analysis_results.get('file_stats', {}).values() if isinstance(v,dict)],
-                key=lambda x: x.get('lines', 0), reverse=True)[:10] # Top 10
+            total_files = results.get('total_files_analyzed', 1) or 1
+            # Sorted as (language, count) pairs by count (stable for ties), then built in one comprehension
+            language_stats_list = [
+                {'language': lang, 'count': count, 'percentage': round((count / total_files) * 100, 1)}
+                for lang, count in sorted(results.get('language_stats', {}).items(), key=itemgetter(1), reverse=True)]
+
+            largest_file_items = heapq.nlargest( # Top 10, same order (ties included) as a full sort
+                10, ((path, v) for path, v in results.get('file_stats', {}).items() if isinstance(v,dict)),
+                key=lambda item: item[1].get('lines', 0))
+            largest_files_list = [v for _, v in largest_file_items]
+            sample_files = largest_file_items[:3] if PYGMENTS_AVAILABLE else [] # Sample from top 3 largest
+
+            # Same analysis and unchanged sample files as the last report (e.g. a second click)?
+            # Reopen that file instead of reading, highlighting and rendering everything again
+            fingerprint = hashlib.blake2b(
+                repr((results, [(path, _file_stamp(path)) for path, _ in sample_files], now.year)).encode('utf-8'),
+                digest_size=16).digest()
+            if self._last_basic_report and self._last_basic_report[0] == fingerprint \
+                    and os.path.exists(self._last_basic_report[1]):
+                self.write_to_console(f"Basic HTML report unchanged: {self._last_basic_report[1]}")
+                self._open_report_in_browser(self._last_basic_report[1])
+                return
 
             # --- Code Samples (Optional based on Pygments) ---
             code_samples = []
             if PYGMENTS_AVAILABLE:
                  try:
-                    sample_files = largest_files_list[:3] # Sample from top 3 largest
-                    for file_data in sample_files:
-                        file_path_sample = file_data.get('path')
-                        if not file_path_sample or not os.path.exists(file_path_sample): continue
-                        try:
-                            # Use chardet result from analysis if available, else default to utf-8
-                            file_encoding = file_data.get('encoding', 'utf-8')
-                            if 'Read Error' in file_encoding or 'N/A' in file_encoding: file_encoding = 'utf-8'
-
-                            with open(file_path_sample, 'r', encoding=file_encoding, errors='ignore') as f:
-                                content = f.read()
-                            # Truncate very long samples
-                            lines = content.splitlines()
-                            if len(lines) > 150:
-                                content = '\n'.join(lines[:150]) + '\n\n... (truncated) ...'
-
-                            try: lexer = get_lexer_for_filename(file_path_sample, stripall=True)
-                            except ClassNotFound: lexer = guess_lexer(content, stripall=True)
-                            formatter = HtmlFormatter(style='monokai', noclasses=True, linenos=False) # Inline styles, no line numbers
-                            highlighted_code = highlight(content, lexer, formatter)
-                            code_samples.append({'filename': file_data['name'], 'code': highlighted_code})
-                        except Exception as e_inner:
-                             self.write_to_console(f"Warning: Couldn't create code sample for {file_data.get('name', 'unknown file')}: {e_inner}")
+                    sample_css = _sample_highlighting()[2]
+                    if sample_files:
+                        # Reading and highlighting are independent per file, so the samples are
+                        # built on a small pool (reads overlap); map() keeps their order
+                        with ThreadPoolExecutor(max_workers=len(sample_files), thread_name_prefix='code-sample') as executor:
+                            for sample, warning in executor.map(self._render_code_sample, *zip(*sample_files)):
+                                if warning: self.write_to_console(warning)
+                                if sample: code_samples.append(sample)
                  except Exception as e_outer:
                       self.write_to_console(f"Warning: Error during code sample processing: {e_outer}")
             else:
@@ -1015,24 +1258,26 @@ class RetroConsole(tk.Tk):
 
             # --- Template Data ---
             template_data = {
-                'project_path': self.analysis_results.get('project_path', 'N/A'),
-                'analysis_date': self.analysis_results.get('analysis_date', 'N/A'),
-                'total_files': self.analysis_results.get('total_files_analyzed', 0),
-                'total_lines': self.analysis_results.get('total_lines', 0),
-                'code_lines': self.analysis_results.get('code_lines', 0),
-                'comment_lines': self.analysis_results.get('comment_lines', 0),
+                'project_path': results.get('project_path', 'N/A'),
+                'analysis_date': results.get('analysis_date', 'N/A'),
+                'total_files': results.get('total_files_analyzed', 0),
+                'total_lines': results.get('total_lines', 0),
+                'code_lines': results.get('code_lines', 0),
+                'comment_lines': results.get('comment_lines', 0),
                 'language_stats': language_stats_list,
                 'largest_files': largest_files_list,
                 'code_samples': code_samples,
-                'rick_quote': self.analysis_results.get('rick_quote', RICK_QUOTES[0]),
-                'current_year': datetime.now().year
+                'pygments_css': sample_css if code_samples else '',
+                'rick_quote': results.get('rick_quote', RICK_QUOTES[0]),
+                'current_year': now.year
             }
 
             # --- Render and Write ---
-            template = jinja2.Template(HTML_TEMPLATE)
-            html_content = template.render(**template_data)
-            with open(file_path, 'w', encoding='utf-8') as f:
-                f.write(html_content)
+            # Streamed straight into the file so the full page (highlighted samples included) is never held as one string
+            template = get_report_template('report.html')
+            with open(file_path, 'w', encoding='utf-8', buffering=REPORT_WRITE_BUFFER) as f:
+                template.stream(**template_data).dump(f)
+            self._last_basic_report = (fingerprint, file_path)
 
             self.write_to_console(f"Basic HTML report generated: {file_path}")
             self._open_report_in_browser(file_path)
@@ -1060,12 +1305,14 @@ class RetroConsole(tk.Tk):
         file_path = None
         try:
             self.write_to_console("\nGenerating Fun HTML report... This might get weird!")
+            now = datetime.now()
+            project_path = self.project_path.get() # Read the Tk variable once
             report_dir = os.path.join(os.path.expanduser("~"), "RickCodeAnalyzer")
             os.makedirs(report_dir, exist_ok=True)
 
-            project_name = os.path.basename(self.project_path.get()) if self.project_path.get() else "fun_report"
-            safe_project_name = "".join(c for c in project_name if c.isalnum() or c in ('_', '-')).rstrip()
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+            project_name = os.path.basename(project_path) if project_path else "fun_report"
+            safe_project_name = SAFE_NAME_STRIP_RE.sub('', project_name)
+            timestamp = now.strftime('%Y%m%d_%H%M%S')
             file_path = os.path.join(report_dir, f"rick_fun_report_{safe_project_name}_{timestamp}.html")
 
             # Prepare data - should already be mostly formatted by fun_analyzer
@@ -1076,14 +1323,16 @@ class RetroConsole(tk.Tk):
                 return
 
             # Add common fields if missing
-            if 'project_path' not in template_data: template_data['project_path'] = self.project_path.get()
-            if 'analysis_date' not in template_data: template_data['analysis_date'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            if 'current_year' not in template_data: template_data['current_year'] = datetime.now().year
+            if 'project_path' not in template_data: template_data['project_path'] = project_path
+            if 'analysis_date' not in template_data: template_data['analysis_date'] = now.strftime('%Y-%m-%d %H:%M:%S')
+            if 'current_year' not in template_data: template_data['current_year'] = now.year
 
-            # Render and Write
-            template = jinja2.Template(FUN_HTML_TEMPLATE)
-            html_content = template.render(**template_data)
-            with open(file_path, 'w', encoding='utf-8') as f: f.write(html_content)
+            # Nothing to tabulate: render the short empty-state page instead of the full report
+            has_any = any(template_data.get(key) for key in
+                          ('rick_references', 'jerry_detections', 'swear_total', 'task_total', 'personality_groups'))
+            template = get_report_template('fun_report.html' if has_any else 'fun_report_empty.html')
+            with open(file_path, 'w', encoding='utf-8', buffering=REPORT_WRITE_BUFFER) as f:
+                template.stream(**template_data).dump(f)
 
             self.write_to_console(f"Fun HTML report generated: {file_path}")
             self._open_report_in_browser(file_path)
@@ -1099,6 +1348,11 @@ class RetroConsole(tk.Tk):
 
 # --- Main Execution Block ---
 if __name__ == "__main__":
+    # Must come first: in a frozen (PyInstaller) build, the fun analysis's spawned worker processes
+    # re-run this entry point, and freeze_support() turns them into workers instead of new windows
+    import multiprocessing
+    multiprocessing.freeze_support()
+
     # Ensure required directories exist (optional, for robustness)
     # try:
     #     log_dir = os.path.join(os.path.expanduser("~"), ".ricks_analyzer", "logs")